@@ -0,0 +1,49 @@
+import sys, os, re, time, subprocess, argparse
+from typing import Dict, Tuple
+
+PATH = os.path.join(os.path.dirname(__file__), "..")
+IMPORT_TIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+# caminho real de uma compilação: importa o compilador e compila um .form, sem gravar arquivos
+COMPILE = "from src.compiler import compile_source; compile_source(open({form!r}).read())"
+
+def compile_run(form: str) -> Tuple[float, Dict[str, int]]:
+    """Compila `form` em um interpretador novo; retorna o tempo total (s) e o tempo acumulado (us) de cada import de topo."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", COMPILE.format(form=form)], cwd=PATH, capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - start
+    times = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match and len(match.group(3)) == 1: # só os imports de topo, já incluindo os que eles fazem
+            times[match.group(4)] = times.get(match.group(4), 0) + int(match.group(2))
+    return elapsed, times
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Benchmark de regressão do tempo de inicialização + compilação de um formulário")
+    arg_parser.add_argument("--form", default="exemple.form", help="formulário compilado a cada execução (relativo à raiz do repositório)")
+    arg_parser.add_argument("--repeat", type=int, default=10)
+    arg_parser.add_argument("--max-ms", type=float, default=None, help="falha (exit 1) se o melhor tempo de compilação passar deste limite")
+    args = arg_parser.parse_args()
+
+    runs = [compile_run(args.form) for _ in range(args.repeat)]
+    totals = sorted(elapsed * 1000 for elapsed, _ in runs)
+    best = min(runs, key=lambda run: run[0])[1]
+    print(f"compile {args.form} (new process): best {totals[0]:.2f} ms | median {totals[len(totals)//2]:.2f} ms ({args.repeat} runs)")
+    print(f"imports: {sum(best.values())/1000:.2f} ms, slowest (cumulative, best run):")
+    for name, cumulative in sorted(best.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {cumulative/1000:8.2f} ms  {name}")
+
+    starts = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "main.py"], cwd=PATH, capture_output=True, check=True)
+        starts.append(time.perf_counter() - start)
+    print(f"python main.py (usage): best {min(starts)*1000:.2f} ms")
+
+    if args.max_ms is not None and totals[0] > args.max_ms:
+        print(f"Regression: compiling {args.form} took {totals[0]:.2f} ms (limit {args.max_ms} ms)")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import sys, os, time, tempfile, subprocess, argparse
+
+PATH = os.path.join(os.path.dirname(__file__), "..")
+PARSER = os.path.join(PATH, "src", "flex_bison", "parser")
+
+def generate_form(statements: int) -> str:
+    """Gera um .form com `statements` declarações na raiz, em um bloco onChange e em uma lista de opções."""
+    lines = [f"Number n{i} = {i} + {i}.5 * 2" for i in range(statements)]
+    lines.append("Form grande {")
+    lines.append("    Field opcoes Select {")
+    lines.append("        options = [")
+    lines.extend(f'            "opcao {i}",' for i in range(statements))
+    lines.append('            "ultima"')
+    lines.append("        ]")
+    lines.append("        onChange {")
+    lines.extend(f'            if (n{i} > {i}) then {{\n                on[opcoes]display("n{i}")\n            }}' for i in range(statements))
+    lines.append("        }")
+    lines.append("    }")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Micro-benchmark do parser flex+bison")
+    arg_parser.add_argument("--statements", type=int, default=5000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--parser", default=PARSER)
+    args = arg_parser.parse_args()
+
+    if not os.path.exists(args.parser):
+        print(f"Parser not found: {args.parser} (build it first, see README)")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        form_filename = os.path.join(tmp, "benchmark.form")
+        with open(form_filename, "w") as file:
+            file.write(generate_form(args.statements))
+
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            subprocess.run([args.parser, "--stream", form_filename], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            times.append(time.perf_counter() - start)
+
+    best = min(times)
+    print(f"statements: {args.statements} (x3 kinds) | runs: {args.repeat}")
+    print(f"best: {best*1000:.2f} ms | mean: {sum(times)/len(times)*1000:.2f} ms | {3*args.statements/best:,.0f} statements/s")
+
+if __name__ == "__main__":
+    main()
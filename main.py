@@ -1,40 +1,93 @@
-import sys, os, subprocess
+import sys, os, argparse
+from typing import List, Dict, TYPE_CHECKING
 
-from src.ast_read import read_AST
-from src.preprocessor import PreProcessor
-from src.node import SymbolTable
-from src.code_generator import Code
+if TYPE_CHECKING:
+    from src.node import Node
+    from src.ast_read import NodePool
 
 PATH = os.path.join(os.path.dirname(__file__))
     
-def run_parser(filename: str, path: str = "./") -> None:
-    """Executa parser flex+bison para gerar o AST a partir do arquivo .form."""
-    try:
-        result = subprocess.run([os.path.join(path, "src", "flex_bison", "parser"), filename], capture_output=True, text=True, check=True)
-        print(result.stdout)
-    except subprocess.CalledProcessError as e:
-        print("Erro ao executar o parser:")
-        print(e.stderr)
-        sys.exit(1)
+def run_parser(filenames: List[str], path: str = "./", pool: 'NodePool' = None) -> Dict[str, 'Node']:
+    """Executa o parser flex+bison uma única vez para todos os arquivos .form, retornando o AST de cada um."""
+    import subprocess
+    from src.ast_read import read_AST_stream
+    
+    result = subprocess.run([os.path.join(path, "src", "flex_bison", "parser"), "--stream", *filenames], capture_output=True, text=True)
+    if result.stderr:
+        print(result.stderr, end="")
+    if result.returncode != 0:
+        print("Erro ao executar o parser")
+    return read_AST_stream(result.stdout, pool)
     
 def main() -> None:
+    arg_parser = argparse.ArgumentParser(usage="python main.py <exemple.form>... [--runtime-dir DIR] [--runtime-url URL] [--fragment-cache FILE] [--hash-consing] [--numeric-dates] [--split-forms] [--prelude FILE]")
+    arg_parser.add_argument("form_filenames", nargs="+")
+    arg_parser.add_argument("--runtime-dir", default=None, help="diretório compartilhado onde o runtime (form.js/style.css) é gravado com hash de conteúdo")
+    arg_parser.add_argument("--runtime-url", default="/runtime", help="URL pela qual o diretório do runtime compartilhado é servido")
+    arg_parser.add_argument("--fragment-cache", default=None, help="arquivo do cache persistente de fragmentos gerados (campos e blocos repetidos entre execuções)")
+    arg_parser.add_argument("--hash-consing", action="store_true", help="compartilha um único nó entre literais e expressões constantes idênticos do AST de cada arquivo e informa a taxa de deduplicação")
+    arg_parser.add_argument("--numeric-dates", action="store_true", help="representa datas e horários como inteiros (dias desde 1970-01-01 e minutos desde 00:00) no código gerado")
+    arg_parser.add_argument("--split-forms", action="store_true", help="gera um módulo JS por Form, carregado apenas quando o formulário aparece na tela ou recebe foco")
+    arg_parser.add_argument("--prelude", default=None, help="arquivo .form com declarações da raiz compartilhadas por todos os formulários, compilado uma única vez (snapshot em FILE.snapshot)")
     if len(sys.argv) < 2:
-        print("Usage: python main.py <exemple.form>")
+        arg_parser.print_usage()
         return
+    args = arg_parser.parse_args()
     
+    # importados só depois dos argumentos, para que uso/ajuda não paguem o custo dos módulos do compilador
+    from src.node import Node, SymbolTable
+    from src.preprocessor import PreProcessor
+    from src.code_generator import Code
+    from src.fragment_cache import FragmentCache
+    from src.ast_read import NodePool
     
-    form_filename = sys.argv[1]
-    run_parser(form_filename, PATH)
-    filename = os.path.splitext(form_filename)[0]
-    ast_filename = filename+".json"
+    if args.fragment_cache is not None:
+        FragmentCache.open_store(args.fragment_cache)
+    Code.numeric_dates = args.numeric_dates
+    Code.split_forms = args.split_forms
+    if args.prelude is not None:
+        from src.compiler import CompileException
+        from src.prelude import Prelude
+        try:
+            PreProcessor.prelude = Prelude.open(args.prelude)
+        except CompileException as e:
+            for diagnostic in e.diagnostics:
+                print(f"[!] {args.prelude}:{diagnostic}")
+            print(f"Erro: não foi possível compilar o prelúdio {args.prelude}")
+            sys.exit(1)
+    pool = NodePool() if args.hash_consing else None
+    ASTs = run_parser(args.form_filenames, PATH, pool)
+    if pool is not None:
+        print(f"AST hash-consing: {pool}")
+    failed = [form_filename for form_filename in args.form_filenames if form_filename not in ASTs]
+    for form_filename, AST in ASTs.items():
+        filename = os.path.splitext(form_filename)[0]
+        Code.source_dir = os.path.dirname(form_filename) or "."
+        st = SymbolTable(name="root")
+        PreProcessor.preprocess(st)
+        AST.evaluate(st)
+        # print(st)
+        if Node.errors:
+            for error in Node.errors:
+                print(f"[!] {form_filename}:{error}")
+            print(f"{len(Node.errors)} error(s) found in {form_filename}")
+            failed.append(form_filename)
+            Node.errors.clear()
+            Node.queue.clear()
+            Code.reset()
+            continue
+        PreProcessor.generate()
+        AST.generate()
+        Code.dump(filename, runtime_path=args.runtime_dir, runtime_url=args.runtime_url, source_filename=form_filename)
+        Code.reset()
     
-    AST = read_AST(ast_filename)
-    st = SymbolTable(name="root")
-    PreProcessor.preprocess(st)
-    AST.evaluate(st)
-    # print(st)
-    AST.generate()
-    Code.dump(filename)
+    if args.fragment_cache is not None:
+        FragmentCache.close_store()
+        stats = FragmentCache.stats()
+        print(f"Fragment cache: {stats['hits']} hit(s), {stats['misses']} miss(es)")
+    if failed:
+        print(f"Erro: não foi possível compilar: {', '.join(failed)}")
+        sys.exit(1)
     
 if __name__ == "__main__":
     main()
\ No newline at end of file
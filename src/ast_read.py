@@ -1,67 +1,164 @@
-import sys, os, json
+import json, math
+from typing import Dict, List, Set, Type, Tuple, Iterator
 
 from .node import Node
-from .nodes_basic import RootBlock, Block, Identifier, Variable, Assignment, BinOp, UnOp, IfOp, WhileOp
-from .nodes_basic import NumberValue, StringValue, BooleanValue, DateValue, TimeValue, ListValue, Attribute, AttributeAccess, AttributeAssignment
-from .nodes_form import Display, ObjectBlock, Form, FormField, FormOnSubmit, FieldOnChange
-from .nodes_form import FieldRequiredParam, FieldTitleParam, FieldDescriptionParam, FieldPlaceholderParam, FieldOptionsParam, FieldDefaultParam, CancelOp
 
-NODES = {
-    "root": RootBlock,
-    "block": Block,
-    "identifier": Identifier,
-    "variable": Variable,
-    "assignment": Assignment,
-    "bin_op": BinOp,
-    "un_op": UnOp,
-    "if": IfOp,
-    "while": WhileOp,
-    "display": Display,
+NODES: Dict[str, Type[Node]] = {}
+
+def get_NODES() -> Dict[str, Type[Node]]:
+    """Registro tipo do AST -> classe do nó, montado (importando os módulos de nós) apenas no primeiro uso."""
+    if not NODES:
+        from .nodes_basic import RootBlock, Block, Identifier, Variable, Assignment, BinOp, UnOp, IfOp, WhileOp
+        from .nodes_basic import NumberValue, StringValue, BooleanValue, DateValue, TimeValue, ListValue, Attribute, AttributeAccess, AttributeAssignment
+        from .nodes_form import Display, ObjectBlock, Form, FormField, FormOnSubmit, FieldOnChange
+        from .nodes_form import FieldRequiredParam, FieldTitleParam, FieldDescriptionParam, FieldPlaceholderParam, FieldOptionsParam, FieldOptionsSourceParam, FieldDefaultParam, FieldDebounceParam, CancelOp
+        
+        NODES.update({
+            "root": RootBlock,
+            "block": Block,
+            "identifier": Identifier,
+            "variable": Variable,
+            "assignment": Assignment,
+            "bin_op": BinOp,
+            "un_op": UnOp,
+            "if": IfOp,
+            "while": WhileOp,
+            "display": Display,
+
+            "number": NumberValue,
+            "string": StringValue,
+            "boolean": BooleanValue,
+            "date": DateValue,
+            "time": TimeValue,
+            "list": ListValue,
+
+            "attribute": Attribute,
+            "attribute_access": AttributeAccess,
+            "attribute_assignment": AttributeAssignment,
+
+            "object": ObjectBlock,
+            "form": Form,
+            "field": FormField,
+            "form_onSubmit": FormOnSubmit,
+            "required": FieldRequiredParam,
+            "title": FieldTitleParam,
+            "description": FieldDescriptionParam,
+            "placeholder": FieldPlaceholderParam,
+            "options": FieldOptionsParam,
+            "options_source": FieldOptionsSourceParam,
+            "default": FieldDefaultParam,
+            "field_onChange": FieldOnChange,
+            "debounce": FieldDebounceParam,
+            "cancel": CancelOp,
+        })
+    return NODES
+
+class ASTException(Exception):
+    pass
+
+def validate_AST(data: dict) -> None:
+    """Validação rápida (iterativa, sem criar os nós) da estrutura do AST gerado pelo parser."""
+    registry = get_NODES()
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict) or node.get("type") not in registry:
+            raise ASTException(f"Invalid AST node: {str(node)[:80]}")
+        value = node.get("value", None)
+        if node["type"] == "number":
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise ASTException(f"Invalid number value: {value!r}")
+        elif value is not None and not isinstance(value, str):
+            raise ASTException(f"Invalid value for '{node['type']}' node: {value!r}")
+        location = node.get("loc", None)
+        if location is not None and (not isinstance(location, list) or len(location) != 2 or not all(isinstance(n, int) for n in location)):
+            raise ASTException(f"Invalid location for '{node['type']}' node: {location!r}")
+        children = node.get("children", [])
+        if not isinstance(children, list):
+            raise ASTException(f"Invalid children for '{node['type']}' node")
+        stack.extend(children)
+
+class NodePool:
+    """
+    Tabela de hash-consing do load_AST: subárvores puras (literais e expressões, ver Node.pure)
+    estruturalmente idênticas passam a ser um único nó, compartilhado por todas as ocorrências.
+    O nó compartilhado mantém a posição da primeira ocorrência, o que não afeta erros nem source
+    maps, que usam a posição dos statements.
+    Como o evaluate registra nos nós os tipos inferidos (ver BinOp.operand_types), só são compartilhadas
+    subárvores sem identificadores ou atributos (Node.scoped), e cada arquivo tem sua própria tabela:
+    o código gerado para um formulário não depende dos outros compilados junto com ele.
+    """
+    def __init__(self) -> None:
+        self.nodes:Dict[tuple, Node] = {}
+        self.shared:Set[int] = set() # id dos nós da tabela
+        self.loaded = 0
+        self.unique = 0
+    
+    def intern(self, key:tuple, AST:Node) -> Node:
+        self.loaded += 1
+        self.unique += 1
+        self.nodes[key] = AST
+        self.shared.add(id(AST))
+        return AST
+    
+    def shareable(self, node:Type[Node], children:List[Node]) -> bool:
+        return node.pure and not node.scoped and all(id(child) in self.shared for child in children)
     
-    "number": NumberValue,
-    "string": StringValue,
-    "boolean": BooleanValue,
-    "date": DateValue,
-    "time": TimeValue,
-    "list": ListValue,
+    def next_file(self) -> None:
+        """Inicia a tabela do próximo arquivo, mantendo as estatísticas acumuladas."""
+        self.nodes.clear()
+        self.shared.clear()
     
-    "attribute": Attribute,
-    "attribute_access": AttributeAccess,
-    "attribute_assignment": AttributeAssignment,
+    def dedup_ratio(self) -> float:
+        """Fração dos nós puros carregados que reaproveitaram um nó já existente."""
+        return 1 - self.unique / self.loaded if self.loaded else 0.0
     
-    "object": ObjectBlock,
-    "form": Form,
-    "field": FormField,
-    "form_onSubmit": FormOnSubmit,
-    "required": FieldRequiredParam,
-    "title": FieldTitleParam,
-    "description": FieldDescriptionParam,
-    "placeholder": FieldPlaceholderParam,
-    "options": FieldOptionsParam,
-    "default": FieldDefaultParam,
-    "field_onChange": FieldOnChange,
-    "cancel": CancelOp,
-}
+    def __str__(self) -> str:
+        return f"{self.loaded} shareable node(s) loaded, {self.unique} unique ({self.dedup_ratio():.1%} deduplicated)"
 
-def load_AST(data: dict) -> Node:
-    children = [load_AST(child) for child in data.get("children", [])]
+def load_AST(data: dict, pool:NodePool=None) -> Node:
+    children = [load_AST(child, pool) for child in data.get("children", [])]
     try:
-        node = NODES[data["type"]]
-        return node(data.get("value", None), *children)
+        node = get_NODES()[data["type"]]
+        value = data.get("value", None)
+        pure = pool is not None and pool.shareable(node, children)
+        if pure:
+            # filhos já foram internados, então a identidade deles basta para comparar as subárvores
+            key = (data["type"], type(value), value, tuple(id(child) for child in children))
+            shared = pool.nodes.get(key)
+            if shared is not None:
+                pool.loaded += 1
+                return shared
+        AST = node(value, *children)
+        if "loc" in data:
+            AST.location = tuple(data["loc"])
+        return pool.intern(key, AST) if pure else AST
     except Exception as e:
-        print(f"Error loading node: {node} with data: {data}")
-        print(f"report this issue to the developers")
-        sys.exit(1)
+        raise ASTException(f"Error loading node with data: {data} ({e}), report this issue to the developers") from e
     
-def read_AST(filename:str, path:str="./") -> Node:
-    ast_filepath = os.path.join(path, filename)
+def parse_AST(text:str, pool:NodePool=None) -> Node:
+    """Converte o JSON de um AST em nós, levantando ASTException se ele for inválido."""
     try:
-        with open(ast_filepath, "r") as file:
-            ASTdata = json.load(file)    
-    except FileNotFoundError:
-        print(f"Error: File {ast_filepath} not found.")
-        sys.exit(1)
-    AST = load_AST(ASTdata)
-    print(f"AST loaded successfully from {ast_filepath}")
-    os.remove(ast_filepath)
-    return AST
\ No newline at end of file
+        ASTdata = json.loads(text)
+    except ValueError as e:
+        raise ASTException(f"Invalid JSON: {e}") from e
+    validate_AST(ASTdata)
+    return load_AST(ASTdata, pool)
+    
+def split_AST_stream(stream:str) -> Iterator[Tuple[str, str]]:
+    """Separa a saída do parser em modo --stream: para cada arquivo, uma linha '#AST <arquivo>' seguida do JSON do AST."""
+    lines = iter(stream.split("\n"))
+    for line in lines:
+        if line.startswith("#AST "):
+            yield line[len("#AST "):], next(lines, "")
+    
+def read_AST_stream(stream:str, pool:NodePool=None) -> Dict[str, Node]:
+    ASTs = {}
+    for filename, text in split_AST_stream(stream):
+        if pool is not None:
+            pool.next_file()
+        try:
+            ASTs[filename] = parse_AST(text, pool)
+        except ASTException as e:
+            print(f"Error: invalid AST for {filename}: {e}")
+    return ASTs
\ No newline at end of file
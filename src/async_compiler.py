@@ -0,0 +1,63 @@
+import os, asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from .compiler import PARSER, Artifacts, CompileException, parser_command, check_parser_output, compile_AST
+
+class AsyncCompiler:
+    """
+    Versão asyncio de compile_source, para servidores que atendem muitas compilações simultâneas.
+    O parser roda como subprocesso assíncrono e a avaliação/geração em um pool de processos, já que
+    o estado de Node e Code é global por processo. No máximo `max_pending` compilações ficam em
+    andamento; as demais esperam sua vez (backpressure) em vez de acumular subprocessos e tarefas.
+    """
+    def __init__(self, workers: int = None, max_pending: int = None) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.pending = asyncio.Semaphore(max_pending or 4 * self.workers)
+
+    async def __aenter__(self) -> 'AsyncCompiler':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def parse(self, text: str) -> str:
+        """Executa o parser sem bloquear o event loop; se a tarefa for cancelada, o subprocesso é encerrado."""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *parser_command(), stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+        except OSError as e:
+            raise CompileException(f"Parser not available at {PARSER} ({e}), build it first (see README)") from e
+        try:
+            stdout, stderr = await process.communicate(text.encode())
+        except asyncio.CancelledError:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        return check_parser_output(process.returncode, stdout.decode(), stderr.decode())
+
+    async def compile(self, text: str, name: str = "form", runtime_url: str = None, numeric_dates: bool = False, source_dir: str = None, split_forms: bool = False, prelude: str = None) -> Artifacts:
+        """Equivalente assíncrono de compile_source, com as mesmas exceções (o prelúdio é carregado uma vez por processo do pool)."""
+        await self.pending.acquire()
+        try:
+            AST_text = await self.parse(text)
+            loop = asyncio.get_running_loop()
+            job = self.executor.submit(compile_AST, AST_text, text, name, runtime_url, numeric_dates, source_dir, split_forms, prelude)
+        except BaseException:
+            self.pending.release()
+            raise
+        # a vaga só é liberada quando o pool termina (ou descarta) a tarefa: cancelar o await não interrompe
+        # uma compilação que já está rodando, e ela continuaria ocupando um processo fora do limite
+        job.add_done_callback(lambda _: release_threadsafe(loop, self.pending))
+        return await asyncio.wrap_future(job) # cancelar aqui remove a tarefa do pool se ela ainda não começou a rodar
+
+def release_threadsafe(loop: asyncio.AbstractEventLoop, semaphore: asyncio.Semaphore) -> None:
+    try:
+        loop.call_soon_threadsafe(semaphore.release)
+    except RuntimeError:
+        pass # event loop já encerrado: ninguém mais espera pela vaga
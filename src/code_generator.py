@@ -1,13 +1,44 @@
-from typing import List
+from typing import List, Dict, Tuple, Set, Union
 import os, shutil, re
 
-JS_BASE = """import {{ Form, FormField, display, DateWrapper, TimeWrapper }} from './form.js';
+from .source_map import marker, extract_mappings, source_map
+
+RUNTIME_FILES = ["form.js", "style.css"]
+
+RUNTIME_IMPORTS = "import {{ Form, FormField, display, DateWrapper, TimeWrapper, _add, _subtract, _equals, useNumericDates, formatDate, formatTime, wrapMinutes }} from '{runtime_js}';"
+
+JS_BASE = RUNTIME_IMPORTS + """
 
 // Generated code for {filename}.form
 
 {code}
 """
 
+# --split-forms: variáveis da raiz em common.js, um módulo por Form e um script.js que os carrega sob demanda
+COMMON_MODULE = RUNTIME_IMPORTS + """
+
+// Shared root-level code for {filename}.form
+
+export const root = {{}};
+{code}
+"""
+
+FORM_MODULE = RUNTIME_IMPORTS + """
+import {{ root }} from './common.js';
+
+// Generated code for form '{form}' of {filename}.form
+
+{code}
+"""
+
+ENTRY_MODULE = """import {{ lazyForm }} from '{runtime_js}';
+import './common.js';
+
+// Generated code for {filename}.form: each form module is loaded when the form is first seen or focused
+
+{code}
+"""
+
 
 HTML_BASE = """ <!-- Generated HTML for {filename}.form -->
 <!DOCTYPE html>
@@ -18,7 +49,7 @@ HTML_BASE = """ <!-- Generated HTML for {filename}.form -->
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{filename}</title>
     <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/meyer-reset/2.0/reset.min.css" integrity="sha512-NmLkDIU1C/C88wi324HBc+S2kLhi08PN5GDeUVVVC/BVt/9Izdsc9SVeVfA1UZbY3sHUlDSyRXhCzHfr6hmPPw==" crossorigin="anonymous" />
-    <link rel="stylesheet" href="./style.css">
+    <link rel="stylesheet" href="{runtime_css}">
 </head>
 <body>
     <span class="PAGE" id="PAGE-display"></span>
@@ -29,15 +60,47 @@ HTML_BASE = """ <!-- Generated HTML for {filename}.form -->
 """
 
 
+def write_atomic(path: str, content: bytes) -> None:
+    """Grava em um arquivo temporário e o renomeia: quem lê `path` nunca vê um arquivo pela metade."""
+    import tempfile
+    directory, name = os.path.split(path)
+    descriptor, temp_path = tempfile.mkstemp(dir=directory or ".", prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(content)
+        os.chmod(temp_path, 0o644) # mkstemp cria o arquivo legível só pelo dono
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
 class Code:
     code_instructions:List[str] = []
     html_elements:List[str] = []
     indent = 0
     inline_code = False
     inline_code_instructions:List[str] = []
+    runtime_assets:Dict[str, str] = {}
+    compiler_digest:str = None
+    location:Tuple[int, int] = None # trecho do .form que está sendo gerado, para o source map
+    numeric_dates:bool = False # datas como dias desde 1970-01-01 e horários como minutos desde 00:00
+    source_dir:str = None # diretório do .form, de onde podem ser lidos os arquivos de dados; None não permite ler arquivos
+    assets:Dict[str, Union[str, bytes]] = {} # arquivos extras gerados junto do script.js (ex.: opções externas)
+    split_forms:bool = False # um módulo JS por Form (ver ENTRY_MODULE)
+    module:str = None # Form cujo módulo está sendo gerado; None para o código da raiz
+    modules:Dict[str, List[str]] = {}
+    root_names:Set[str] = set() # variáveis da raiz, acessadas como root.<nome> com split_forms
+    local_names:Set[str] = set() # variáveis declaradas no onChange/onSubmit atual, que escondem as da raiz
         
     def append_code(stmt: str, last_block: bool = False) -> None:
-        instructions = Code.inline_code_instructions if Code.inline_code else Code.code_instructions
+        if Code.inline_code:
+            instructions = Code.inline_code_instructions
+        elif Code.module is not None:
+            instructions = Code.modules.setdefault(Code.module, [])
+        else:
+            instructions = Code.code_instructions
+        if Code.location is not None and stmt not in ("{", "}"):
+            stmt = marker(Code.location[0]) + stmt
 
         if last_block:
             for i in reversed(range(len(instructions))):
@@ -54,6 +117,31 @@ class Code:
         Code.inline_code = True
         Code.inline_code_instructions.clear()
         
+    def reset() -> None:
+        """Limpa o código acumulado, para gerar o próximo formulário no mesmo processo."""
+        Code.code_instructions.clear()
+        Code.html_elements.clear()
+        Code.indent = 0
+        Code.inline_code = False
+        Code.inline_code_instructions.clear()
+        Code.location = None
+        Code.source_dir = None
+        Code.assets.clear()
+        Code.module = None
+        Code.modules.clear()
+        Code.root_names.clear()
+        Code.local_names.clear()
+        
+    def root_name(name: str) -> str:
+        """Nome pelo qual o código gerado acessa a variável `name` (com split_forms, as da raiz ficam em `root`)."""
+        if Code.split_forms and name in Code.root_names and name not in Code.local_names:
+            return f"root.{name}"
+        return name
+        
+    def add_asset(filename: str, content: Union[str, bytes]) -> str:
+        Code.assets[filename] = content
+        return f"./{filename}"
+        
     def dump_inline_code() -> str:
         code = ""
         if Code.inline_code:
@@ -62,25 +150,108 @@ class Code:
             Code.inline_code_instructions.clear()
         return code
     
-    def dump(filename: str, path:str="./") -> None:
+    def hash_runtime(template_path: str) -> Dict[str, str]:
+        """Calcula (uma vez por processo) o nome com hash de conteúdo de cada arquivo do runtime."""
+        if not Code.runtime_assets:
+            import hashlib # só necessário com o runtime compartilhado
+            for runtime_file in RUNTIME_FILES:
+                with open(os.path.join(template_path, runtime_file), 'rb') as file:
+                    digest = hashlib.sha256(file.read()).hexdigest()[:12]
+                name, ext = os.path.splitext(runtime_file)
+                Code.runtime_assets[runtime_file] = f"{name}.{digest}{ext}"
+        return Code.runtime_assets
+    
+    def hash_compiler() -> str:
+        """Hash (calculado uma vez por processo) do código do compilador, para invalidar caches e snapshots de versões anteriores."""
+        if Code.compiler_digest is None:
+            import hashlib
+            source_path = os.path.dirname(__file__)
+            digest = hashlib.blake2b(digest_size=8)
+            for source in sorted(os.listdir(source_path)):
+                if source.endswith(".py"):
+                    with open(os.path.join(source_path, source), 'rb') as file:
+                        digest.update(file.read())
+            Code.compiler_digest = digest.hexdigest()
+        return Code.compiler_digest
+    
+    def dump_runtime(template_path: str, runtime_path: str) -> Dict[str, str]:
+        """Copia o runtime para um diretório compartilhado, apenas se a versão com o mesmo hash ainda não existir (ou estiver incompleta)."""
+        os.makedirs(runtime_path, exist_ok=True)
+        assets = Code.hash_runtime(template_path)
+        for runtime_file, hashed_file in assets.items():
+            hashed_path = os.path.join(runtime_path, hashed_file)
+            with open(os.path.join(template_path, runtime_file), 'rb') as file:
+                content = file.read()
+            # o tamanho detecta cópias truncadas deixadas por versões que não gravavam atomicamente
+            if not os.path.exists(hashed_path) or os.path.getsize(hashed_path) != len(content):
+                write_atomic(hashed_path, content)
+        return assets
+    
+    def dump(filename: str, path:str="./", runtime_path:str=None, runtime_url:str="/runtime", source_filename:str=None) -> None:
         template_path = os.path.join(path, 'src', 'template')
         build_path = os.path.join(path, filename)
         os.makedirs(build_path, exist_ok=True)
-        with open(os.path.join(build_path, "script.js"), 'w') as js, open(os.path.join(build_path, "index.html"), 'w') as html:
-            name = filename.split("/")[-1]
+        
+        if runtime_path is not None:
+            assets = Code.dump_runtime(template_path, runtime_path)
+            runtime_url = runtime_url.rstrip("/")
+            runtime_js = f"{runtime_url}/{assets['form.js']}"
+            runtime_css = f"{runtime_url}/{assets['style.css']}"
+        else:
+            for runtime_file in RUNTIME_FILES:
+                shutil.copy(os.path.join(template_path, runtime_file), os.path.join(build_path, runtime_file))
+            runtime_js, runtime_css = "./form.js", "./style.css"
             
-            code = Code.dump_code(Code.code_instructions).replace("#", "")
-            js.write(JS_BASE.format(filename=name, code=code))
-
-            body = "\n".join(Code.html_elements)
-            html.write(HTML_BASE.format(filename=name, body=body))
-        shutil.copy(os.path.join(template_path, "style.css"), os.path.join(build_path, "style.css"))
-        shutil.copy(os.path.join(template_path, "form.js"), os.path.join(build_path, "form.js"))
+        name = filename.split("/")[-1]
+        source_name, source_content = None, None
+        if source_filename is not None:
+            with open(source_filename, 'r') as source:
+                source_name, source_content = os.path.relpath(source_filename, build_path), source.read()
+        
+        for output_file, content in Code.render(name, runtime_js, runtime_css, source_name, source_content).items():
+            with open(os.path.join(build_path, output_file), 'wb' if isinstance(content, bytes) else 'w') as output:
+                output.write(content)
         print(f"Code generated successfully in: {filename}/")
+        if runtime_path is not None:
+            print(f"Shared runtime available in: {runtime_path}/ (served as {runtime_url}/)")
         print(f"To view the form run a local server in the folder: {filename}/")
         print(f"e.g. python3 -m http.server -d {filename}/")
             
+    def render(name: str, runtime_js: str="./form.js", runtime_css: str="./style.css", source_name: str=None, source_content: str=None) -> Dict[str, Union[str, bytes]]:
+        """Monta, em memória, o conteúdo de cada arquivo gerado (script.js, index.html, assets e, com o fonte, script.js.map)."""
+        files = dict(Code.assets)
+        code = Code.dump_code(Code.code_instructions).replace("#", "")
+        if Code.numeric_dates:
+            code = "useNumericDates();\n" + code
+        if not Code.split_forms:
+            files.update(Code.render_module("script.js", JS_BASE.format(filename=name, code=code, runtime_js=runtime_js), source_name, source_content))
+        else:
+            files.update(Code.render_module("common.js", COMMON_MODULE.format(filename=name, code=code, runtime_js=runtime_js), source_name, source_content))
+            loaders = []
+            for form_name, instructions in Code.modules.items():
+                form_code = Code.dump_code(instructions).replace("#", "")
+                module = FORM_MODULE.format(filename=name, form=form_name, code=form_code, runtime_js=runtime_js)
+                files.update(Code.render_module(f"form-{form_name}.js", module, source_name, source_content))
+                loaders.append(f"lazyForm('{form_name}', () => import('./form-{form_name}.js'));")
+            files["script.js"] = ENTRY_MODULE.format(filename=name, code="\n".join(loaders), runtime_js=runtime_js)
+
+        body = "\n".join(Code.html_elements)
+        files["index.html"] = HTML_BASE.format(filename=name, body=body, runtime_css=runtime_css)
+        return files
+            
+    def render_module(filename: str, code: str, source_name: str=None, source_content: str=None) -> Dict[str, str]:
+        """Remove os marcadores de posição do módulo, gerando também o seu source map quando o fonte é conhecido."""
+        files = {}
+        script, mappings = extract_mappings(code)
+        if source_content is not None:
+            files[f"{filename}.map"] = source_map(mappings, filename, source_name, source_content)
+            script += f"//# sourceMappingURL={filename}.map\n"
+        files[filename] = script
+        return files
+            
     def dump_code(code_instructions: List[str]) -> str:
+        if not code_instructions:
+            return ""
         code = ""
         for i, instruction in enumerate(code_instructions[:-1]):
             next_line = code_instructions[i + 1]
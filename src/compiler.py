@@ -0,0 +1,131 @@
+import os, subprocess, threading
+from typing import Dict, List, Union
+
+from .ast_read import parse_AST, split_AST_stream, ASTException
+from .node import Node, SymbolTable
+from .preprocessor import PreProcessor
+from .code_generator import Code, RUNTIME_FILES
+
+PARSER = os.path.join(os.path.dirname(__file__), "flex_bison", "parser")
+TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "template")
+
+# Code, Node e PreProcessor guardam o estado da compilação em atributos de classe: uma compilação por vez no processo
+COMPILE_LOCK = threading.Lock()
+
+class CompileException(Exception):
+    """Falha ao compilar um .form; `diagnostics` traz uma mensagem por erro encontrado."""
+    def __init__(self, message: str, diagnostics: List[str] = None) -> None:
+        super().__init__(message)
+        self.diagnostics = diagnostics if diagnostics is not None else [message]
+
+    def __reduce__(self):
+        # preserva `diagnostics` ao atravessar processos (ver async_compiler)
+        return type(self), (str(self), self.diagnostics)
+
+class ParserException(CompileException):
+    pass
+
+class SemanticException(CompileException):
+    pass
+
+class Artifacts:
+    """Arquivos gerados por compile_source, indexados pelo nome (script.js, index.html, ...)."""
+    def __init__(self, files: Dict[str, Union[str, bytes]]) -> None:
+        self.files = files
+
+    @property
+    def html(self) -> str:
+        return self.files["index.html"]
+
+    @property
+    def js(self) -> str:
+        return self.files["script.js"]
+
+    @property
+    def source_map(self) -> str:
+        return self.files.get("script.js.map")
+
+def parser_command() -> List[str]:
+    return [PARSER, "--stdin"]
+
+def check_parser_output(returncode: int, stdout: str, stderr: str) -> str:
+    """Valida a saída do parser (modo --stdin), retornando o JSON do AST ou levantando ParserException."""
+    diagnostics = [line[len("[!] "):] for line in stderr.splitlines() if line.startswith("[!] ")]
+    ASTs = list(split_AST_stream(stdout))
+    if returncode != 0 or not ASTs:
+        raise ParserException(f"{len(diagnostics)} syntax error(s) found", diagnostics or [stderr.strip()])
+    return ASTs[0][1]
+
+def parse_source(text: str) -> str:
+    """Executa o parser sobre o código-fonte passado pela entrada padrão, sem arquivos temporários."""
+    try:
+        result = subprocess.run(parser_command(), input=text, capture_output=True, text=True)
+    except OSError as e:
+        raise CompileException(f"Parser not available at {PARSER} ({e}), build it first (see README)") from e
+    return check_parser_output(result.returncode, result.stdout, result.stderr)
+
+def compile_AST(AST_text: str, text: str, name: str = "form", runtime_url: str = None, numeric_dates: bool = False, source_dir: str = None, split_forms: bool = False, prelude: str = None) -> Artifacts:
+    """
+    Avalia e gera o código a partir do JSON do AST já produzido pelo parser para o código-fonte `text`.
+    Compilações de threads diferentes são serializadas (ver COMPILE_LOCK); para paralelismo real use processos (ver AsyncCompiler).
+    """
+    with COMPILE_LOCK:
+        try:
+            AST = parse_AST(AST_text)
+        except ASTException as e:
+            raise CompileException(str(e)) from e
+        try:
+            Code.numeric_dates = numeric_dates
+            Code.source_dir = source_dir
+            Code.split_forms = split_forms
+            if prelude is not None:
+                from .prelude import Prelude # só necessário com prelúdio
+                PreProcessor.prelude = Prelude.open(prelude, snapshot=False)
+            else:
+                PreProcessor.prelude = None
+            st = SymbolTable(name="root")
+            PreProcessor.preprocess(st)
+            AST.evaluate(st)
+            if Node.errors:
+                raise SemanticException(f"{len(Node.errors)} error(s) found", list(Node.errors))
+            PreProcessor.generate()
+            AST.generate()
+            if runtime_url is None:
+                files = Code.render(name, source_name=f"{name}.form", source_content=text)
+                files.update(runtime_files(hashed=False))
+            else:
+                assets = Code.hash_runtime(TEMPLATE_PATH)
+                runtime_url = runtime_url.rstrip("/")
+                files = Code.render(name, f"{runtime_url}/{assets['form.js']}", f"{runtime_url}/{assets['style.css']}", f"{name}.form", text)
+            return Artifacts(files)
+        except CompileException:
+            raise
+        except Exception as e:
+            raise CompileException(f"Internal compiler error: {e}, report this issue to the developers") from e
+        finally:
+            Code.reset()
+            Node.errors.clear()
+            Node.queue.clear()
+
+def compile_source(text: str, name: str = "form", runtime_url: str = None, numeric_dates: bool = False, source_dir: str = None, split_forms: bool = False, prelude: str = None) -> Artifacts:
+    """
+    Compila o código-fonte de um .form inteiramente em memória, sem ler ou gravar arquivos do projeto.
+    Sem `runtime_url` o runtime (form.js/style.css) é incluído nos artefatos; com ele, os arquivos
+    gerados apontam para as versões com hash de conteúdo servidas nessa URL (ver runtime_files).
+    Com `numeric_dates`, datas e horários são inteiros no código gerado (ver main.py --numeric-dates).
+    Opções externas (`options from "..."`) só são aceitas com `source_dir`, e apenas de arquivos dentro dele;
+    sem ele o código-fonte não lê nenhum arquivo, o que permite compilar fontes não confiáveis.
+    Com `split_forms`, `js` é só o ponto de entrada; cada Form fica em `form-<nome>.js` (ver main.py --split-forms).
+    `prelude` é o caminho de um .form com declarações compartilhadas; aqui ele é compilado só em memória, sem snapshot (ver Prelude).
+    Pode ser chamada de várias threads, mas as compilações são feitas uma de cada vez (ver compile_AST).
+    """
+    return compile_AST(parse_source(text), text, name, runtime_url, numeric_dates, source_dir, split_forms, prelude)
+
+def runtime_files(hashed: bool = True) -> Dict[str, str]:
+    """Conteúdo do runtime, nomeado com o hash de conteúdo usado pelos artefatos gerados com `runtime_url`."""
+    names = Code.hash_runtime(TEMPLATE_PATH) if hashed else {runtime_file: runtime_file for runtime_file in RUNTIME_FILES}
+    files = {}
+    for runtime_file, output_file in names.items():
+        with open(os.path.join(TEMPLATE_PATH, runtime_file), 'r') as file:
+            files[output_file] = file.read()
+    return files
@@ -6,79 +6,186 @@
     void yyerror(const char *s);
     int yylex();
     extern FILE *yyin;  // Permite leitura de arquivo no Flex
+    void yyrestart(FILE *input_file);  // Reinicia o Flex para um novo arquivo
+
+    const char *current_filename = "";  // arquivo sendo analisado, para as mensagens de erro
+    int error_count = 0;  // erros de sintaxe encontrados no arquivo atual
+    // Posição compactada em um inteiro: linha nos bits altos, coluna nos 16 bits baixos
+    #define PACK_POSITION(line, column) (((long long)(line) << 16) | ((column) > 0xFFFF ? 0xFFFF : (column)))
+    long long rule_start = PACK_POSITION(1, 1), rule_end = PACK_POSITION(1, 1);  // trecho da regra sendo reduzida, usado como posição dos nós
+
+    // Mesmo cálculo do YYLLOC_DEFAULT padrão do bison, guardando também o trecho da regra
+    #define YYLLOC_DEFAULT(Current, Rhs, N)                                 \
+        do {                                                                \
+            if (N) {                                                        \
+                (Current).first_line   = YYRHSLOC(Rhs, 1).first_line;       \
+                (Current).first_column = YYRHSLOC(Rhs, 1).first_column;     \
+                (Current).last_line    = YYRHSLOC(Rhs, N).last_line;        \
+                (Current).last_column  = YYRHSLOC(Rhs, N).last_column;      \
+            } else {                                                        \
+                (Current).first_line   = (Current).last_line   =            \
+                    YYRHSLOC(Rhs, 0).last_line;                             \
+                (Current).first_column = (Current).last_column =            \
+                    YYRHSLOC(Rhs, 0).last_column;                           \
+            }                                                               \
+            rule_start = PACK_POSITION((Current).first_line, (Current).first_column); \
+            rule_end = PACK_POSITION((Current).last_line, (Current).last_column);     \
+        } while (0)
 
     void print(const char *msg) {
         printf("%s\n", msg);
         fflush(stdout);
     }
 
+    // Arena: os nós e textos da AST são alocados em blocos grandes e liberados de uma vez
+    #define ARENA_BLOCK_SIZE (64 * 1024)
+
+    typedef struct ArenaBlock {
+        struct ArenaBlock *next;
+        size_t used;
+        size_t size;
+    } ArenaBlock;
+
+    ArenaBlock *arena = NULL;
+
+    void *arena_alloc(size_t size) {
+        size = (size + 7) & ~(size_t)7;
+        if (!arena || arena->used + size > arena->size) {
+            size_t block_size = size > ARENA_BLOCK_SIZE ? size : ARENA_BLOCK_SIZE;
+            ArenaBlock *block = (ArenaBlock *)malloc(sizeof(ArenaBlock) + block_size);
+            block->next = arena;
+            block->used = 0;
+            block->size = block_size;
+            arena = block;
+        }
+        void *ptr = (char *)(arena + 1) + arena->used;
+        arena->used += size;
+        return ptr;
+    }
+
+    char *arena_strdup(const char *str) {
+        size_t len = strlen(str) + 1;
+        char *copy = (char *)arena_alloc(len);
+        memcpy(copy, str, len);
+        return copy;
+    }
+
+    // Libera a arena, mantendo o bloco mais recente para reutilizar no próximo arquivo
+    void arena_reset() {
+        if (!arena) return;
+        ArenaBlock *block = arena->next;
+        while (block) {
+            ArenaBlock *next = block->next;
+            free(block);
+            block = next;
+        }
+        arena->next = NULL;
+        arena->used = 0;
+    }
+
+    // Tipos dos nós internados: cada tipo é guardado uma única vez e comparado por ponteiro
+    #define MAX_TAGS 64
+    const char *tags[MAX_TAGS];
+    int tag_count = 0;
+
+    const char *intern_tag(const char *type) {
+        for (int i = 0; i < tag_count; i++) {
+            if (strcmp(tags[i], type) == 0) return tags[i];
+        }
+        if (tag_count == MAX_TAGS) {
+            fprintf(stderr, "Too many node types\n");
+            exit(1);
+        }
+        return tags[tag_count++] = strdup(type);
+    }
+
+    const char *NUMBER_TAG = intern_tag("number");
+
     // Estrutura de nó da AST
     typedef union {
         char *s_value;
-        float f_value;
+        double f_value;
     } Value;
 
+    // Os filhos formam uma lista ligada (first_child -> next_sibling), sem realloc a cada filho
     typedef struct Node {
-        char *type;
+        const char *type;
         Value value;
-        struct Node **children;
+        struct Node *first_child;
+        struct Node *last_child;
+        struct Node *next_sibling;
         int child_count;
+        long long start;  // posição inicial compactada (PACK_POSITION)
+        long long end;    // posição final compactada (PACK_POSITION)
     } Node;
 
     Node *create_node(const char *type, const void *value=NULL) {
-        Node *node = (Node *)malloc(sizeof(Node));
-        node->type = strdup(type);
-        node->children = NULL;
+        Node *node = (Node *)arena_alloc(sizeof(Node));
+        node->type = intern_tag(type);
+        node->first_child = NULL;
+        node->last_child = NULL;
+        node->next_sibling = NULL;
         node->child_count = 0;
+        node->start = rule_start;
+        node->end = rule_end;
 
         if (!value) {
             node->value.s_value = NULL;
-        } else if (strcmp(type, "number") == 0) {
-            node->value.f_value = *(float *)value;
+        } else if (node->type == NUMBER_TAG) {
+            node->value.f_value = *(double *)value;
         } else {
-            node->value.s_value = strdup((char *)value);
+            node->value.s_value = arena_strdup((char *)value);
         }
 
         return node;
     }
 
     void add_child(Node *parent, Node *child) {
-        parent->children = (Node **)realloc(parent->children, sizeof(Node *) * (parent->child_count + 1));
-        parent->children[parent->child_count++] = child;
+        if (!child) return;
+        if (parent->last_child) {
+            parent->last_child->next_sibling = child;
+        } else {
+            parent->first_child = child;
+        }
+        parent->last_child = child;
+        parent->child_count++;
     }
 
-    void free_ast(Node *node) {
-        if (!node) return;
-
-        for (int i = 0; i < node->child_count; i++) {
-            free_ast(node->children[i]);
-        }
-        
-        if (strcmp(node->type, "number") != 0) {
-            free(node->value.s_value);
+    // Escreve uma string JSON, escapando aspas, barras e caracteres de controle
+    void save_json_string(const char *str, FILE *file) {
+        fputc('"', file);
+        for (const unsigned char *c = (const unsigned char *)str; *c; c++) {
+            switch (*c) {
+                case '"':  fputs("\\\"", file); break;
+                case '\\': fputs("\\\\", file); break;
+                case '\n': fputs("\\n", file); break;
+                case '\r': fputs("\\r", file); break;
+                case '\t': fputs("\\t", file); break;
+                default:
+                    if (*c < 0x20) fprintf(file, "\\u%04x", *c);
+                    else fputc(*c, file);
+            }
         }
-        free(node->type);
-        free(node->children);
-        free(node);
+        fputc('"', file);
     }
 
     void save_ast_json(Node *node, FILE *file) {
         if (!node) return;
 
         fprintf(file, "{ \"type\": \"%s\"", node->type);
-        if (strcmp(node->type, "number") == 0) {
-            fprintf(file, ", \"value\": %.8g", node->value.f_value);
+        if (node->type == NUMBER_TAG) {
+            fprintf(file, ", \"value\": %.17g", node->value.f_value);  // %.17g: ida e volta sem perda para double
         } else if (node->value.s_value) {
-            fprintf(file, ", \"value\": \"%s\"", node->value.s_value);
+            fprintf(file, ", \"value\": ");
+            save_json_string(node->value.s_value, file);
         }
+        fprintf(file, ", \"loc\": [%lld, %lld]", node->start, node->end);
 
-        if (node->child_count > 0 && node->children) {
+        if (node->first_child) {
             fprintf(file, ", \"children\": [");
-            for (int i = 0; i < node->child_count; i++) {
-                if (node->children[i]) {
-                    save_ast_json(node->children[i], file);
-                }
-                if (i < node->child_count - 1) fprintf(file, ", ");
+            for (Node *child = node->first_child; child; child = child->next_sibling) {
+                save_ast_json(child, file);
+                if (child->next_sibling) fprintf(file, ", ");
             }
             fprintf(file, "]");
         }
@@ -90,8 +197,8 @@
         struct ScopeStack *next;
     } ScopeStack;
 
-    Node *root = create_node("root");  // Raiz da AST
-    Node *current_scope = root;  // scopo atual para colocar os nós da AST
+    Node *root = NULL;  // Raiz da AST
+    Node *current_scope = NULL;  // scopo atual para colocar os nós da AST
     ScopeStack *scope_stack = NULL; // Pilha de escopos para gerenciar blocos
 
     Node *create_scope_node(const char *type, const void *value=NULL) {
@@ -116,6 +223,15 @@
             current_scope = root;
         }
     }
+
+    // Prepara uma AST vazia para o próximo arquivo
+    void reset_ast() {
+        while (scope_stack) exit_scope();
+        arena_reset();
+        rule_start = rule_end = PACK_POSITION(1, 1);
+        root = create_node("root");
+        current_scope = root;
+    }
 %}
 
 %define parse.error verbose  // Mensagens de erro detalhadas
@@ -123,7 +239,7 @@
 %locations
 
 %union {
-    float number;
+    double number;
     char* string;
     int boolean;
     struct Node* node; 
@@ -168,11 +284,13 @@ block:
     start_block statement_list CLOSE_BRK { exit_scope(); $$ = $1; }
     ;
 
+// listas recursivas à esquerda: a pilha do bison não cresce com o número de itens
 statement_list:
     /* vazio */
-    | NEWLINE statement_list
-    | statement NEWLINE statement_list
-    | statement YYEOF
+    | statement_list NEWLINE
+    | statement_list statement NEWLINE
+    | statement_list statement YYEOF
+    | statement_list error NEWLINE { yyerrok; }  // recupera do erro e continua na próxima linha
     ;
 
 
@@ -216,8 +334,9 @@ form_block:
 
 form_statement_list:
     /* vazio */
-    | NEWLINE form_statement_list
-    | form_statement NEWLINE form_statement_list
+    | form_statement_list NEWLINE
+    | form_statement_list form_statement NEWLINE
+    | form_statement_list error NEWLINE { yyerrok; }
     ;
 
 form_statement:
@@ -230,8 +349,9 @@ field_block:
 
 field_statement_list:
     /* vazio */
-    | NEWLINE field_statement_list
-    | field_statement NEWLINE field_statement_list
+    | field_statement_list NEWLINE
+    | field_statement_list field_statement NEWLINE
+    | field_statement_list error NEWLINE { yyerrok; }
     ;
 
 field_statement:
@@ -241,7 +361,29 @@ field_statement:
     | PLACEHOLDER ASSIGN boolean_expression { Node *node = create_node("placeholder"); add_child(node, $3); add_child(current_scope, node); }
     | DEFAULT ASSIGN boolean_expression { Node *node = create_node("default"); add_child(node, $3); add_child(current_scope, node); }
     | OPTIONS ASSIGN list { Node *node = create_node("options"); add_child(node, $3); add_child(current_scope, node); }
+    // `from` só é palavra-chave depois de `options`: em qualquer outro lugar é um identificador comum
+    | OPTIONS IDENTIFIER STRING {
+        if (strcmp($2, "from") != 0) {
+            char message[256];
+            snprintf(message, sizeof(message), "expected 'from' after 'options', got '%.200s'", $2);
+            yylloc = @2;
+            yyerror(message);
+            YYERROR;
+        }
+        Node *node = create_node("options_source"); add_child(node, create_node("string", $3)); add_child(current_scope, node);
+    }
     | ONCHANGE block { Node *node = create_node("field_onChange"); add_child(node, $2); add_child(current_scope, node); }
+    // `debounce` só é palavra-chave aqui: fora dos parâmetros de campo continua sendo um identificador comum
+    | IDENTIFIER ASSIGN NUMBER {
+        if (strcmp($1, "debounce") != 0) {
+            char message[256];
+            snprintf(message, sizeof(message), "unknown field parameter '%.200s'", $1);
+            yylloc = @1;
+            yyerror(message);
+            YYERROR;
+        }
+        Node *node = create_node("debounce"); add_child(node, create_node("number", &($3))); add_child(current_scope, node);
+    }
     ;
 
 field_type:
@@ -278,9 +420,9 @@ list:
 
 list_items:
     /* vazio */
-    | NEWLINE list_items 
-    | boolean_expression COMMA list_items { add_child(current_scope, $1); }
-    | boolean_expression NEWLINE { add_child(current_scope, $1); }
+    | list_items NEWLINE
+    | list_items boolean_expression COMMA { add_child(current_scope, $2); }
+    | list_items boolean_expression NEWLINE { add_child(current_scope, $2); }
     ;
 
 boolean_expression:
@@ -329,43 +471,107 @@ factor:
 %%
 
 void yyerror(const char *s) {
-    fprintf(stderr, "[!] %s\n", s);
+    error_count++;
+    fprintf(stderr, "[!] %s:%d:%d: %s\n", current_filename, yylloc.first_line, yylloc.first_column, s);
 }
 
-int main(int argc, char *argv[]) {
-    if (argc != 2) {
-        fprintf(stderr, "use: %s <input_file.form>\n", argv[0]);
+char *ast_filename(const char *source_filename) {
+    size_t len = strlen(source_filename);
+    char *output_filename = (char *)malloc(len + strlen(".json") + 1);
+    strcpy(output_filename, source_filename);
+    char *dot = strrchr(output_filename, '.');
+    char *slash = strrchr(output_filename, '/');
+    (dot && (!slash || dot > slash)) ? strcpy(dot, ".json") : strcat(output_filename, ".json");
+    return output_filename;
+}
+
+// Analisa o código de um .form; no modo stream a AST vai para stdout precedida de "#AST <arquivo>"
+int parse_source(FILE *source_file, const char *source_filename, int stream) {
+    reset_ast();
+    current_filename = source_filename;
+    error_count = 0;
+    yylloc.first_line = yylloc.last_line = 1;
+    yylloc.first_column = yylloc.last_column = 1;
+    yyin = source_file;
+    yyrestart(yyin);
+    int status = yyparse();
+    if (status != 0 || error_count > 0) {
+        fprintf(stderr, "Parsing failed: %s (%d error(s))\n", source_filename, error_count);
         return 1;
     }
 
-    char source_filename[256];
-    strcpy(source_filename, argv[1]);
+    if (stream) {
+        printf("#AST %s\n", source_filename);
+        save_ast_json(root, stdout);
+        printf("\n");
+        fflush(stdout);
+        fprintf(stderr, "Parsing completed successfully: %s\n", source_filename);
+        return 0;
+    }
+
+    char *output_filename = ast_filename(source_filename);
+    FILE *output_file = fopen(output_filename, "w");
+    if (!output_file) {
+        fprintf(stderr, "Error opening/creating the output file for the AST: %s\n", output_filename);
+        free(output_filename);
+        return 1;
+    }
+    printf("Parsing completed successfully.\n");
+    save_ast_json(root, output_file);
+    printf("AST saved to JSON file: %s\n", output_filename);
+    fclose(output_file);
+    free(output_filename);
+    return 0;
+}
+
+int parse_file(const char *source_filename, int stream) {
     FILE *source_file = fopen(source_filename, "r");
     if (!source_file) {
         fprintf(stderr, "Error opening the source file: %s\n", source_filename);
         return 1;
     }
+    int failed = parse_source(source_file, source_filename, stream);
+    fclose(source_file);
+    return failed;
+}
 
-    char output_filename[256];
-    strcpy(output_filename, source_filename);
-    char *dot = strrchr(output_filename, '.');
-    (dot) ? strcpy(dot, ".json") : strcat(output_filename, ".json");
-    FILE *output_file = fopen(output_filename, "w");
-    if (!output_file) {
-        fprintf(stderr, "Error opening/creating the output file for the AST");
+int main(int argc, char *argv[]) {
+    int stream = 0;
+    int first = 1;
+    if (argc > 1 && strcmp(argv[1], "--stream") == 0) {
+        stream = 1;
+        first = 2;
+    }
+    // --stdin: o próprio código-fonte vem da entrada padrão e o AST sai sempre em modo stream
+    if (argc == first + 1 && strcmp(argv[first], "--stdin") == 0) {
+        int failed = parse_source(stdin, "<stdin>", 1);
+        arena_reset();
+        free(arena);
+        return failed;
+    }
+    if (argc <= first) {
+        fprintf(stderr, "use: %s [--stream] <input_file.form>... (use '-' to read the file list from stdin)\n", argv[0]);
+        fprintf(stderr, "     %s [--stream] --stdin (read the source code itself from stdin)\n", argv[0]);
         return 1;
     }
 
-    yyin = source_file;
-
-    if (yyparse() == 0) {
-        printf("Parsing completed successfully.\n");
-        save_ast_json(root, output_file); 
-        printf("AST saved to JSON file: %s\n", output_filename);
-        free_ast(root); 
+    int failures = 0;
+    for (int i = first; i < argc; i++) {
+        if (strcmp(argv[i], "-") != 0) {
+            failures += parse_file(argv[i], stream);
+            continue;
+        }
+        char *line = NULL;
+        size_t capacity = 0;
+        ssize_t len;
+        while ((len = getline(&line, &capacity, stdin)) != -1) {
+            while (len > 0 && (line[len - 1] == '\n' || line[len - 1] == '\r')) line[--len] = '\0';
+            if (len > 0) failures += parse_file(line, stream);
+        }
+        free(line);
     }
 
-    fclose(source_file);
-    fclose(output_file);
-    return 0;
-}
\ No newline at end of file
+    arena_reset();
+    free(arena);
+    return failures ? 1 : 0;
+}
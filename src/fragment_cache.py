@@ -0,0 +1,90 @@
+from typing import Any, Callable, Dict, Tuple, Union, TYPE_CHECKING
+from collections import OrderedDict
+
+from .code_generator import Code
+from .source_map import shift_markers
+
+if TYPE_CHECKING:
+    from .node import Node
+
+Fragment = Tuple[Tuple[str, ...], Union[str, None]] # (elementos HTML adicionados, código retornado pelo generate)
+
+class FragmentCache:
+    """
+    Cache, endereçado pelo conteúdo, do código gerado para subárvores que se repetem entre formulários
+    (campos, blocos onChange/onSubmit e listas literais). A chave é um hash estrutural da subárvore,
+    incluindo as posições dos statements relativas ao início dela: trechos copiados e colados em
+    qualquer linha compartilham o mesmo fragmento, e os marcadores do source map são deslocados.
+    """
+    capacity:int = 1024 # 0 desativa o cache
+    fragments:'OrderedDict[str, Fragment]' = OrderedDict()
+    store = None # shelve opcional, persistente entre execuções
+    store_salt:str = ""
+    hits:int = 0
+    misses:int = 0
+
+    def key(node: 'Node', origin: int) -> str:
+        import hashlib # só necessário com o cache ativo
+        digest = hashlib.blake2b(f"{Code.indent}|{Code.numeric_dates}".encode(), digest_size=16)
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if not hasattr(current, "children"):
+                digest.update(f"{current!r};".encode())
+                continue
+            # a posição de expressões não aparece no código gerado (os marcadores vêm dos statements)
+            location = (current.location[0] - origin, current.location[1] - origin) if current.location is not None and not current.pure else None
+            digest.update(f"{current.__class__.__name__}|{current.value!r}|{location}|{current.inferred_types()}|{len(current.children)};".encode())
+            stack.extend(reversed(current.children))
+        return digest.hexdigest()
+
+    def lookup(key: str) -> Union[Fragment, None]:
+        fragment = FragmentCache.fragments.get(key)
+        if fragment is not None:
+            FragmentCache.fragments.move_to_end(key)
+        elif FragmentCache.store is not None:
+            fragment = FragmentCache.store.get(FragmentCache.store_salt + key)
+            if fragment is not None:
+                FragmentCache.remember(key, fragment)
+        return fragment
+
+    def remember(key: str, fragment: Fragment) -> None:
+        FragmentCache.fragments[key] = fragment
+        if len(FragmentCache.fragments) > FragmentCache.capacity:
+            FragmentCache.fragments.popitem(last=False)
+
+    def generate(node: 'Node', generate: Callable[[], Any]) -> Any:
+        """Executa `generate` (o gerador do próprio nó) ou reaproveita o fragmento de uma subárvore idêntica."""
+        if FragmentCache.capacity <= 0 or Code.split_forms:
+            # com split_forms o código de um identificador depende das variáveis da raiz (ver Code.root_name)
+            return generate()
+        origin = (node.location[0] >> 16) << 16 if node.location is not None else 0
+        key = FragmentCache.key(node, origin)
+        fragment = FragmentCache.lookup(key)
+        if fragment is None:
+            FragmentCache.misses += 1
+            start = len(Code.html_elements)
+            result = generate()
+            code = shift_markers(result, -(origin >> 16)) if result is not None else None
+            fragment = (tuple(Code.html_elements[start:]), code)
+            FragmentCache.remember(key, fragment)
+            if FragmentCache.store is not None:
+                FragmentCache.store[FragmentCache.store_salt + key] = fragment
+            return result
+        FragmentCache.hits += 1
+        Code.html_elements.extend(fragment[0])
+        return shift_markers(fragment[1], origin >> 16) if fragment[1] is not None else None
+
+    def open_store(filename: str) -> None:
+        """Abre (ou cria) o cache persistente; as chaves levam o hash do próprio compilador, invalidando fragmentos de versões anteriores."""
+        import shelve
+        FragmentCache.store_salt = Code.hash_compiler() + ":"
+        FragmentCache.store = shelve.open(filename)
+
+    def close_store() -> None:
+        if FragmentCache.store is not None:
+            FragmentCache.store.close()
+            FragmentCache.store = None
+
+    def stats() -> Dict[str, int]:
+        return {"hits": FragmentCache.hits, "misses": FragmentCache.misses, "fragments": len(FragmentCache.fragments)}
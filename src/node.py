@@ -1,15 +1,22 @@
 from abc import ABC, abstractmethod
-from typing import Union, Tuple, List
+from typing import Union, Tuple, List, Set
 
 from .symbol_table import SymbolTable, Symbol
+from .source_map import unpack_position
 
 class EvaluationException(Exception):
     pass
 
+EVALUATION_ERRORS = (EvaluationException, NameError, TypeError, ValueError, KeyError, ZeroDivisionError)
+
 class Node(ABC):
     value: Union[str, float]
     children: Tuple['Node']
+    location: Tuple[int, int] = None # (início, fim) compactados pelo parser, ver unpack_position
+    pure: bool = False # literais e expressões: imutáveis e sem efeitos, podem ser compartilhados (ver NodePool)
+    scoped: bool = False # o valor (e o tipo) depende das variáveis visíveis onde o nó é avaliado
     queue: List[Tuple['Node', SymbolTable]] = []
+    errors: List[str] = []
     
     def __init__(self, value:Union[str, float, bool], *children:Tuple['Node']) -> None:
         self.value = value
@@ -24,6 +31,54 @@ class Node(ABC):
         print(F"Generating code for {self.__class__.__name__} not implemented")
         pass
     
+    def static_value(self) -> Union[str, None]:
+        """Texto do valor, quando conhecido em tempo de compilação (literais)."""
+        return None
+    
+    def inferred_types(self) -> Union[Tuple[str, ...], None]:
+        """Tipos registrados no evaluate que mudam o código gerado (ver FragmentCache.key)."""
+        return None
+    
+    def field_reads(self) -> Set[str]:
+        """Nomes dos campos cujo valor é lido por esta subárvore."""
+        reads = set()
+        for child in self.children:
+            if isinstance(child, Node):
+                reads |= child.field_reads()
+        return reads
+    
+    def state_reads(self) -> Set[str]:
+        """Variáveis e atributos (exceto .value) lidos por esta subárvore: estado que muda sem alterar nenhum campo."""
+        reads = set()
+        for child in self.children:
+            if isinstance(child, Node):
+                reads |= child.state_reads()
+        return reads
+    
+    def attribute_roots(self) -> Set[str]:
+        """Primeiro nome de cada atributo usado por esta subárvore (na raiz, sempre um formulário)."""
+        roots = set()
+        for child in self.children:
+            if isinstance(child, Node):
+                roots |= child.attribute_roots()
+        return roots
+    
+    def untyped_operations(self) -> List['Node']:
+        """Operações desta subárvore cujo código depende dos tipos dos operandos, mas que ficaram sem tipo inferido."""
+        operations = []
+        for child in self.children:
+            if isinstance(child, Node):
+                operations += child.untyped_operations()
+        return operations
+    
+    def evaluate_statement(self, st:SymbolTable) -> None:
+        """Avalia um statement registrando o erro (com linha e coluna) em vez de interromper a compilação."""
+        try:
+            self.evaluate(st)
+        except EVALUATION_ERRORS as e:
+            line, column = unpack_position(self.location[0]) if self.location is not None else ("?", "?")
+            Node.errors.append(f"{line}:{column}: {e.__class__.__name__}: {e}")
+    
     @staticmethod
     def await_evaluate(node:'Node', st:SymbolTable) -> None:
         Node.queue.append((node, st))
@@ -1,13 +1,18 @@
-from typing import List, Tuple
+from typing import List, Tuple, Set, Union
+import json
 
 from .node import Node, EvaluationException
+from .source_map import unpack_position
 from .code_generator import Code
+from .fragment_cache import FragmentCache
 
 from .symbol_table import SymbolTable
 from .symbol_types import Symbol, Date, Time, NUMBER, STRING, BOOLEAN, LIST, DATE, TIME, OBJECT
 
 
 class NoOp(Node):
+    pure = True
+    
     def __init__(self,*void:Tuple[Node]) -> None:
         super().__init__(None)
     
@@ -19,18 +24,24 @@ class NoOp(Node):
 
     
 class BinOp(Node):
+    pure = True
+    operand_types: Tuple[str, str] = None # tipos vistos no evaluate; () se divergirem entre avaliações (nó compartilhado)
+    
     def __init__(self, operation:str, left:Node, right:Node):
         super().__init__(operation, left, right)
     
     def evaluate(self, st:SymbolTable) -> Symbol:
         left = self.children[0].evaluate(st)
         right = self.children[1].evaluate(st)
+        self.record_types(left, right)
         
         if left is None or right is None:
             raise EvaluationException("Cannot evaluate binary operation with None value")
         
         elif self.value == "equal":
             return left == right
+        elif self.value == "not_equal":
+            return left != right
         elif self.value == "greater":
             return left > right
         elif self.value == "less":
@@ -58,18 +69,18 @@ class BinOp(Node):
         right = self.children[1].generate()
         
         if self.value == "equal":
-            return f"({left}).equals({right})"
+            return self.generate_equals(left, right)
         elif self.value == "not_equal":
-            return f"!({left}).equals({right})"
+            return f"!{self.generate_equals(left, right)}"
         elif self.value == "greater":
             return f"{left} > {right}"
         elif self.value == "less":
             return f"{left} < {right}"
               
         elif self.value == "plus":
-            return f"({left}).add({right})"
+            return self.generate_add(left, right)
         elif self.value == "minus":
-            return f"({left}).subtract({right})"
+            return self.generate_subtract(left, right)
         elif self.value == "mult":
             return f"{left} * {right}"
         elif self.value == "div":
@@ -79,8 +90,82 @@ class BinOp(Node):
             return f"{left} && {right}"
         elif self.value == "or":
             return f"{left} || {right}"
+    
+    def inferred_types(self) -> Union[Tuple[str, str], None]:
+        return self.operand_types
+    
+    def untyped_operations(self) -> List[Node]:
+        operations = super().untyped_operations()
+        if self.value in ("equal", "not_equal", "plus", "minus") and (not self.operand_types or None in self.operand_types):
+            operations.append(self)
+        return operations
+    
+    def record_types(self, left:Symbol, right:Symbol) -> None:
+        operand_types = (getattr(left, "type", None), getattr(right, "type", None))
+        if self.operand_types is None:
+            self.operand_types = operand_types
+        elif self.operand_types != operand_types:
+            self.operand_types = ()
+    
+    # com os tipos inferidos no evaluate, emite operadores nativos do JS; Date e Time usam os
+    # métodos dos wrappers, e tipos desconhecidos caem nas funções genéricas do runtime
+    def generate_equals(self, left:str, right:str) -> str:
+        left_type, right_type = self.operand_types or (None, None)
+        if left_type == right_type and left_type in (NUMBER, STRING, BOOLEAN):
+            return f"({left} === {right})"
+        elif left_type == right_type and left_type in (DATE, TIME) and Code.numeric_dates:
+            return f"({left} === {right})"
+        elif left_type == right_type and left_type in (DATE, TIME):
+            return f"({left}).equals({right})"
+        return f"_equals({left}, {right})"
+    
+    def generate_add(self, left:str, right:str) -> str:
+        left_type, right_type = self.operand_types or (None, None)
+        if STRING in (left_type, right_type) and {left_type, right_type} <= {STRING, NUMBER, BOOLEAN}:
+            return f"({left} + {right})"
+        elif left_type == STRING and right_type in (DATE, TIME):
+            return f"({left} + {format_value(right, right_type)})"
+        elif right_type == STRING and left_type in (DATE, TIME):
+            return f"({format_value(left, left_type)} + {right})"
+        elif left_type == right_type == NUMBER:
+            return f"({left} + {right})"
+        elif Code.numeric_dates and {left_type, right_type} == {DATE, NUMBER}:
+            return f"({left} + {right})"
+        elif Code.numeric_dates and {left_type, right_type} == {TIME, NUMBER}:
+            return f"wrapMinutes({left} + {right})"
+        elif left_type in (DATE, TIME) and right_type == NUMBER:
+            return f"({left}).add({right})"
+        elif left_type == NUMBER and right_type in (DATE, TIME):
+            return f"({right}).add({left})"
+        elif left_type == right_type == LIST:
+            return f"[...{left}, ...{right}]"
+        return f"_add({left}, {right})"
+    
+    def generate_subtract(self, left:str, right:str) -> str:
+        left_type, right_type = self.operand_types or (None, None)
+        if left_type == right_type == NUMBER:
+            return f"({left} - {right})"
+        elif Code.numeric_dates and left_type in (DATE, TIME) and right_type in (left_type, NUMBER):
+            return f"wrapMinutes({left} - {right})" if left_type == TIME and right_type == NUMBER else f"({left} - {right})"
+        elif left_type == DATE and right_type == NUMBER:
+            return f"({left}).add(-({right}))"
+        elif left_type in (DATE, TIME) and right_type in (left_type, NUMBER):
+            return f"({left}).subtract({right})"
+        return f"_subtract({left}, {right})"
+
+def format_value(value:str, value_type:str) -> str:
+    """Converte para texto um valor do tipo inferido; no modo numérico, datas e horários são inteiros."""
+    if Code.numeric_dates and value_type == DATE:
+        return f"formatDate({value})"
+    elif Code.numeric_dates and value_type == TIME:
+        return f"formatTime({value})"
+    elif value_type in (DATE, TIME):
+        return f"String({value})"
+    return value
 
 class UnOp(Node):
+    pure = True
+    
     def __init__(self, operation:str, unary:Node):
         super().__init__(operation, unary)
         
@@ -106,26 +191,39 @@ class UnOp(Node):
             return f"-{unary}"
     
 class NumberValue(Node):
+    pure = True
+    
     def __init__(self, value:str, *void:Tuple[Node]):
         super().__init__(value)
     
     def evaluate(self, st:SymbolTable) -> Tuple[str, float]:
         return Symbol(NUMBER, float(self.value))
     
+    def static_value(self) -> str:
+        number = float(self.value)
+        return str(int(number)) if number.is_integer() else str(number)
+    
     def generate(self) -> str:
         return str(self.value)
     
 class StringValue(Node):
+    pure = True
+    
     def __init__(self, value:str, *void:Tuple[Node]):
         super().__init__(value)
     
     def evaluate(self, st:SymbolTable) -> Tuple[str, str]:
         return Symbol(STRING, self.value)
     
+    def static_value(self) -> str:
+        return self.value
+    
     def generate(self) -> str:
-        return f'"{self.value}"'
+        return json.dumps(self.value, ensure_ascii=False)
     
 class BooleanValue(Node):
+    pure = True
+    
     def __init__(self, value:str, *void:Tuple[Node]):
         if value.lower() == "true":
             bool_value = True
@@ -138,48 +236,85 @@ class BooleanValue(Node):
     def evaluate(self, st:SymbolTable) -> Tuple[str, bool]:
         return Symbol(BOOLEAN, self.value)
     
+    def static_value(self) -> str:
+        return "true" if self.value else "false"
+    
     def generate(self) -> str:
         return "true" if self.value else "false"
     
 class DateValue(Node):
+    pure = True
+    
     def __init__(self, value:str, *void:Tuple[Node]):
         super().__init__(value)
     
     def evaluate(self, st:SymbolTable) -> Tuple[str, str]:
         return Symbol(DATE, Date(self.value))
     
+    def static_value(self) -> str:
+        return self.value
+    
     def generate(self) -> str:
+        if Code.numeric_dates:
+            return str(Date(self.value).epoch_days())
         return f"new DateWrapper('{self.value}')"
     
 class TimeValue(Node):
+    pure = True
+    
     def __init__(self, value:str, *void:Tuple[Node]):
         super().__init__(value)
     
     def evaluate(self, st:SymbolTable) -> Tuple[str, str]:
         return Symbol(TIME, Time(self.value))
     
+    def static_value(self) -> str:
+        return self.value
+    
     def generate(self) -> str:
+        if Code.numeric_dates:
+            return str(Time(self.value).minutes())
         return f"new TimeWrapper('{self.value}')"
     
 class ListValue(Node):
+    pure = True
+    
     def __init__(self, void, *values:Tuple[Node]):
         super().__init__(LIST, *values)
     
     def evaluate(self, st:SymbolTable) -> Tuple[str, List[Symbol]]:
         return (LIST, [child.evaluate(st)[1] for child in self.children])
     
+    def static_values(self) -> Union[List[str], None]:
+        """Textos dos itens da lista, se todos forem literais conhecidos em tempo de compilação."""
+        values = [child.static_value() for child in self.children]
+        if any(value is None for value in values):
+            return None
+        return values
+    
     def generate(self) -> str:
+        if self.static_values() is not None:
+            return FragmentCache.generate(self, self.generate_items)
+        return self.generate_items()
+    
+    def generate_items(self) -> str:
         return "[" + ", ".join(child.generate() for child in self.children) + "]"
     
 class Identifier(Node):
+    pure = True
+    scoped = True
+    
     def __init__(self, identifier:str, *void:Tuple[Node]):
         super().__init__(identifier)
     
     def evaluate(self, st:SymbolTable) -> Symbol:
-        return st.getter(self.value)
+        return st.getter(self.value, values_only=True)
+    
+    def state_reads(self) -> Set[str]:
+        return {self.value}
     
     def generate(self) -> str:
-        return self.value
+        return Code.root_name(self.value)
 
 class Variable(Node):
     def __init__(self, var_type:str, identifier:Identifier, expression:Node=NoOp()):
@@ -187,10 +322,18 @@ class Variable(Node):
     
     def evaluate(self, st:SymbolTable) -> None:
         st.create(self.children[0].value, self.value, self.children[1].evaluate(st))
+    
+    def state_reads(self) -> Set[str]:
+        return self.children[1].state_reads()
         
     def generate(self) -> None:
         identifier = self.children[0].value
         expression = self.children[1].generate()
+        if Code.split_forms and Code.indent == 0 and Code.module is None and not Code.inline_code:
+            # compartilhada entre os módulos dos formulários (imports de ES modules são somente leitura)
+            Code.append_code(f"root.{identifier} = {expression if expression is not None else 'undefined'};")
+            return
+        Code.local_names.add(identifier)
         if expression is not None:
             Code.append_code(f"let {identifier} = {expression};")
         else:
@@ -201,22 +344,54 @@ class Assignment(Node):
         super().__init__("assign", identifier, expression)
     
     def evaluate(self, st:SymbolTable) -> None:
-        st.setter(self.children[0].value, self.children[1].evaluate(st))
+        st.setter(self.children[0].value, self.children[1].evaluate(st), values_only=True)
+    
+    def state_reads(self) -> Set[str]:
+        return self.children[1].state_reads()
         
     def generate(self) -> None:
-        Code.append_code(f"{self.children[0].value} = {self.children[1].generate()};")
+        Code.append_code(f"{self.children[0].generate()} = {self.children[1].generate()};")
 
 class RootBlock(Node):
     def __init__(self, void, *statements:Tuple[Node]):
         super().__init__("root_block", *statements)
     
+    modules:List[str] = None # com split_forms, o módulo em que cada statement é gerado (None para common.js)
+    
     def evaluate(self, st:SymbolTable) -> None:
         for statement in self.children:
-            statement.evaluate(st)
+            statement.evaluate_statement(st)
+        if Code.split_forms:
+            self.modules = [self.statement_module(statement, st) for statement in self.children]
+        if Code.numeric_dates and not Node.errors:
+            # sem os tipos, a operação cairia em _add/_subtract/_equals, que tratam datas e horários inteiros como números
+            for operation in self.untyped_operations():
+                line, column = unpack_position(operation.location[0]) if operation.location is not None else ("?", "?")
+                Node.errors.append(f"{line}:{column}: TypeError: Cannot infer the operand types of '{operation.value}', required by --numeric-dates")
+            
+    def statement_module(self, statement:Node, st:SymbolTable) -> Union[str, None]:
+        """
+        Com split_forms, o formulário só existe no seu módulo, carregado sob demanda: um statement da raiz que usa
+        os atributos de um formulário é gerado nesse módulo, logo depois dele, e roda quando o formulário é carregado.
+        """
+        forms = sorted(name for name in statement.attribute_roots() if name in st.table and st.table[name].type == OBJECT)
+        if not forms:
+            return None
+        line, column = unpack_position(statement.location[0]) if statement.location is not None else ("?", "?")
+        if isinstance(statement, Variable):
+            Node.errors.append(f"{line}:{column}: EvaluationException: Root variable '{statement.children[0].value}' cannot read form '{forms[0]}' with --split-forms, the form is only loaded on demand")
+        elif len(forms) > 1:
+            Node.errors.append(f"{line}:{column}: EvaluationException: Statement uses forms {', '.join(repr(form) for form in forms)}, which are loaded separately with --split-forms")
+        return forms[0]
             
     def generate(self) -> None:
-        for statement in self.children:
+        if Code.split_forms:
+            Code.root_names.update(statement.children[0].value for statement in self.children if isinstance(statement, Variable))
+        for i, statement in enumerate(self.children):
+            Code.location = statement.location
+            Code.module = self.modules[i] if Code.split_forms and self.modules is not None else None
             statement.generate()
+        Code.module = None
 
 class Block(Node):
     def __init__(self, void, *statements:Tuple[Node]):
@@ -224,13 +399,16 @@ class Block(Node):
     
     def evaluate(self, st:SymbolTable) -> None:
         for statement in self.children:
-            statement.evaluate(st) 
+            statement.evaluate_statement(st) 
             
     def generate(self) -> None:
         Code.append_code("{")
         Code.indent += 1
+        outer_names = set(Code.local_names)
         for statement in self.children:
+            Code.location = statement.location
             statement.generate()
+        Code.local_names = outer_names
         Code.indent -= 1
         Code.append_code("}")
     
@@ -275,6 +453,9 @@ class WhileOp(Node):
         
 
 class Attribute(Node):
+    pure = True
+    scoped = True
+    
     def __init__(self, attribute_name:str, *identifiers:Tuple[Node]):
         super().__init__(attribute_name, *reversed(identifiers))
     
@@ -283,16 +464,24 @@ class Attribute(Node):
         for i in range(len(self.children)):
             if self.children[i] is None:
                 break
-            obj = self.children[i].evaluate(current_st)
+            obj = current_st.getter(self.children[i].value) # nomes de formulário e campo, não variáveis
             if obj.type != "object":
                 raise EvaluationException(f"Expected an object, got {obj.type}")
             current_st = obj.value
         return Symbol(OBJECT, current_st) 
     
+    def state_reads(self) -> Set[str]:
+        return set() # os identificadores nomeiam o formulário e o campo, não variáveis
+    
+    def attribute_roots(self) -> Set[str]:
+        return {self.children[0].value}
+    
     def generate(self) -> str:
-        return f"#{'.'.join(child.generate() for child in self.children)}.{self.value}"
+        return f"#{'.'.join(child.value for child in self.children)}.{self.value}"
 
 class AttributeAccess(Node):
+    pure = True
+    
     def __init__(self, void, attribute:Node):
         super().__init__("attribute_access", attribute)
     
@@ -303,6 +492,18 @@ class AttributeAccess(Node):
         
         return obj.value.getter(f"__{self.children[0].value}__")
     
+    def field_reads(self) -> Set[str]:
+        attribute = self.children[0]
+        if attribute.value == "value" and len(attribute.children) > 0:
+            return {attribute.children[-1].value}
+        return set()
+    
+    def state_reads(self) -> Set[str]:
+        attribute = self.children[0]
+        if attribute.value != "value":
+            return {".".join(child.value for child in attribute.children if child is not None) + f".{attribute.value}"}
+        return set()
+    
     def generate(self) -> str:
         return f"{self.children[0].generate()}.get()"
         
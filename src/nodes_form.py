@@ -1,24 +1,39 @@
-from typing import List, Tuple
-import re
+from typing import List, Set, Tuple, Union
+import os, re, html, json
 
 from .code_generator import Code
-from .node import Node, EvaluationException
+from .fragment_cache import FragmentCache
+from .node import Node, EvaluationException, EVALUATION_ERRORS
+from .nodes_basic import ListValue, Variable, format_value
 
 from .symbol_table import SymbolTable
-from .symbol_types import Symbol, DEFAULT_VALUE, STRING, BOOLEAN, LIST
+from .symbol_types import Symbol, DEFAULT_TYPES, default_value, STRING, NUMBER, BOOLEAN, LIST
 
 class Display(Node):
     def __init__(self, void, identifier:Node, printable_expression:Node):
         super().__init__("display", identifier, printable_expression)
     
+    printable_type: str = None # tipo do valor exibido, para formatar datas e horários no modo numérico
+    
     def evaluate(self, st:SymbolTable) -> None:
-        on = self.children[0].evaluate(st)
-        if on.type not in ["form", "page", "field"]:
-            raise EvaluationException(f"Display operation can only be performed on 'PAGE', form variable or field variable, not {on.type}")
-        self.children[1].evaluate(st)
+        printable = self.children[1].evaluate(st)
+        self.printable_type = getattr(printable, "type", None)
+        on = st.getter(self.children[0].value) # o alvo nomeia a página, um formulário ou um campo
+        on_type = on.value.getter("__object_type__").value if on.type == "object" else on.type
+        if on_type not in ["form", "page", "field"]:
+            raise EvaluationException(f"Display operation can only be performed on 'PAGE', form variable or field variable, not {on_type}")
+        
+    def inferred_types(self) -> Tuple[str]:
+        return (self.printable_type,)
+    
+    def state_reads(self) -> Set[str]:
+        return self.children[1].state_reads()
         
     def generate(self) -> None:
-        Code.append_code(f"display('{self.children[0].value}', {self.children[1].generate()});")
+        printable = self.children[1].generate()
+        if Code.numeric_dates:
+            printable = format_value(printable, self.printable_type)
+        Code.append_code(f"display('{self.children[0].value}', {printable});")
         
         
 class ObjectBlock(Node):
@@ -27,10 +42,14 @@ class ObjectBlock(Node):
     
     def evaluate(self, st:SymbolTable) -> None:
         for statement in self.children:
-            statement.evaluate(st)
+            statement.evaluate_statement(st)
             
     def generate(self) -> List[str]:
-        return [statement.generate() for statement in self.children]
+        generated = []
+        for statement in self.children:
+            Code.location = statement.location
+            generated.append(statement.generate())
+        return generated
         
 class Form(Node):
     def __init__(self, void, identifier:Node, form_block:Node):
@@ -45,6 +64,9 @@ class Form(Node):
         form_st.sys_create("__name__", STRING, Symbol(STRING, self.children[0].value))
         self.children[1].evaluate(form_st)
         Node.late_evaluate()
+    
+    def attribute_roots(self) -> Set[str]:
+        return set() # os atributos usados dentro do formulário já são gerados no seu módulo
         
     def generate(self) -> None:
         form_name = self.children[0].value
@@ -61,7 +83,13 @@ class Form(Node):
         fields = ",\n".join(childs)
         form_statement = f"const {form_name} = new Form('{form_name}', {{fields: [\n{fields}], {onSubmit}}});"
         form_statement = re.sub(fr"#({form_name}\.)?", lambda m: "" if m.group(1) else f"{form_name}.", form_statement)
-        Code.append_code(form_statement)
+        Code.location = self.location
+        if Code.split_forms:
+            Code.module = form_name
+            Code.append_code(f"export {form_statement}")
+            Code.module = None
+        else:
+            Code.append_code(form_statement)
         Code.append_html(f'<button type="submit" id="{form_name}-submit">Submit</button>')
         Code.append_html(f'<span id="{form_name}-submit-display"></span>')
         Code.append_html("</form>")
@@ -77,9 +105,9 @@ class FormField(Node):
         field_st.sys_create("__object_type__", STRING, Symbol(STRING, "field"))
         field_st.sys_create("__name__", STRING, Symbol(STRING, field_name))
         
-        value_type = self.value if self.value in DEFAULT_VALUE.keys() else "string"
+        value_type = self.value if self.value in DEFAULT_TYPES else "string"
         field_st.sys_create("__type__", STRING, Symbol(STRING, self.value.lower() if self.value != "String" else "text"))
-        field_st.sys_create("__value__", value_type, DEFAULT_VALUE[value_type])
+        field_st.sys_create("__value__", value_type, default_value(value_type))
         field_st.sys_create("__required__", BOOLEAN, Symbol(BOOLEAN, False))
         field_st.sys_create("__title__", STRING, Symbol(STRING, field_name))
         field_st.sys_create("__description__", STRING, Symbol(STRING, ""))
@@ -87,22 +115,64 @@ class FormField(Node):
             field_st.sys_create("__options__", LIST, Symbol(LIST, []))
         else:
             field_st.sys_create("__placeholder__", STRING, Symbol(STRING, ""))
+        # os demais parâmetros do campo ainda não são verificados; os onChange são avaliados apenas para inferir os tipos das operações
+        for param in self.children[1].children:
+            if isinstance(param, FieldOnChange):
+                Node.await_evaluate(param, field_st)
+            elif isinstance(param, (FieldOptionsSourceParam, FieldDebounceParam)):
+                param.evaluate_statement(field_st)
         
-    def generate(self) -> None:
+    def generate(self) -> str:
+        if self.find_param("options_source") is not None:
+            return self.generate_field() # depende do conteúdo do arquivo de opções, não só da subárvore
+        return FragmentCache.generate(self, self.generate_field)
+        
+    def generate_field(self) -> str:
         field_name = self.children[0].value
         field_type = self.value.lower() if self.value != "String" else "text"
         
+        title = self.static_param("title")
+        description = self.static_param("description")
+        placeholder = self.static_param("placeholder")
+        default = self.static_param("default")
+        required = " required" if self.static_param("required") else ""
+        
         Code.append_html(f'<section class="field" id="{field_name}-section">')
-        Code.append_html(f'<label for="{field_name}" id="{field_name}-title">{field_name}</label>')
-        Code.append_html(f'<p id="{field_name}-description"></p>')
+        Code.append_html(f'<label for="{field_name}" id="{field_name}-title">{title if title is not None else field_name}</label>')
+        Code.append_html(f'<p id="{field_name}-description">{description or ""}</p>')
+        options = self.static_param("options") if field_type == "select" else None
+        external = self.find_param("options_source") is not None
         if field_type == "select":
-            Code.append_html(f'<select id="{field_name}" name="{field_name}"></select>')
+            if external:
+                # opções carregadas sob demanda; só o valor padrão precisa existir antes disso
+                options = [default] if default is not None else []
+                Code.append_html(f'<input type="search" class="options-filter" id="{field_name}-filter" placeholder="Filter options..." autocomplete="off" />')
+            options_html = "".join(
+                f'<option value="{html.escape(option)}"{" selected" if option == default else ""}>{html.escape(option, quote=False)}</option>'
+                for option in options or []
+            )
+            Code.append_html(f'<select id="{field_name}" name="{field_name}"{required}>{options_html}</select>')
         else:
-            Code.append_html(f'<input type="{field_type}" id="{field_name}" name="{field_name}" />')
+            attributes = "".join(f' {name}="{html.escape(value)}"' for name, value in [("placeholder", placeholder), ("value", default)] if value is not None)
+            Code.append_html(f'<input type="{field_type}" id="{field_name}" name="{field_name}"{attributes}{required} />')
         Code.append_html(f'<span id="{field_name}-display"></span>')
         Code.append_html('</section>')
         
-        return f"new FormField('{field_name}', '{field_type}', {{{', '.join(self.children[1].generate())}}})"
+        # parâmetros literais já estão no HTML; o runtime só recebe os dinâmicos
+        params = [param for param in self.children[1].generate() if param is not None]
+        if field_type == "select" and options is None and default is not None:
+            params.append(f'defaultValue: {json.dumps(default, ensure_ascii=False)}') # só pode ser selecionado depois das opções dinâmicas
+        return f"new FormField('{field_name}', '{field_type}', {{{', '.join(params)}}})"
+    
+    def static_param(self, name:str) -> Union[str, List[str], None]:
+        param = self.find_param(name)
+        return param.static_value() if param is not None else None
+    
+    def find_param(self, name:str) -> Union[Node, None]:
+        for param in reversed(self.children[1].children):
+            if param.value == name:
+                return param
+        return None
         
 class FormOnSubmit(Node):
     def __init__(self, void, onSubmit_block:Node):
@@ -115,6 +185,9 @@ class FormOnSubmit(Node):
         self.children[0].evaluate(SymbolTable(st, name="onSubmit"))
         
     def generate(self) -> str:
+        return FragmentCache.generate(self, self.generate_handler)
+        
+    def generate_handler(self) -> str:
         Code.start_inline_code()
         Code.append_code(f"() => ")
         self.children[0].generate()
@@ -130,15 +203,36 @@ class FieldOnChange(Node):
         Node.await_evaluate(self, st)
         
     def late_evaluate(self, st:SymbolTable) -> None:
-        self.children[0].evaluate(SymbolTable(st, name="onChange"))
+        # só coleta os tipos (ver BinOp.operand_types): erros deste bloco não interrompem a compilação
+        errors = len(Node.errors)
+        try:
+            self.children[0].evaluate(SymbolTable(st, name="onChange"))
+        except EVALUATION_ERRORS:
+            pass
+        del Node.errors[errors:]
         
     def generate(self) -> str:
+        return FragmentCache.generate(self, self.generate_handler)
+        
+    def generate_handler(self) -> str:
         Code.start_inline_code()
         Code.append_code(f"() => ")
         self.children[0].generate()
         Code.append_code("return true;", last_block=True)
         onChange = Code.dump_inline_code()
-        return f"onChange: {onChange}"
+        reads = ", ".join(f"'{field}'" for field in sorted(self.field_reads()))
+        volatile = ", volatile: true" if self.state_reads() - self.local_names() else ""
+        return f"onChange: {onChange}, reads: [{reads}]{volatile}"
+    
+    def local_names(self) -> Set[str]:
+        """Variáveis declaradas no próprio bloco, cujo valor não sobrevive entre execuções do onChange."""
+        names, stack = set(), [self.children[0]]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Variable):
+                names.add(node.children[0].value)
+            stack.extend(child for child in node.children if isinstance(child, Node))
+        return names
         
 class FieldRequiredParam(Node):
     def __init__(self, *void:Tuple[Node]):
@@ -147,8 +241,11 @@ class FieldRequiredParam(Node):
     def evaluate(self, st:SymbolTable) -> None:
         st.setter("__required__", BOOLEAN, Symbol(BOOLEAN, True))
         
-    def generate(self) -> str:
-        return "required: true"
+    def static_value(self) -> str:
+        return "true"
+        
+    def generate(self) -> None:
+        return None # renderizado como atributo no HTML
         
 class FieldTitleParam(Node):
     def __init__(self, void, title:Node):
@@ -157,7 +254,12 @@ class FieldTitleParam(Node):
     def evaluate(self, st:SymbolTable) -> None:
         st.sys_create("__title__", STRING, self.children[0].evaluate(st))
     
-    def generate(self) -> str:
+    def static_value(self) -> Union[str, None]:
+        return self.children[0].static_value()
+    
+    def generate(self) -> Union[str, None]:
+        if self.static_value() is not None:
+            return None
         title = self.children[0].generate()
         return f"title: {title}"
         
@@ -168,7 +270,12 @@ class FieldDescriptionParam(Node):
     def evaluate(self, st:SymbolTable) -> None:
         st.setter("__description__", self.children[0].evaluate(st))
         
-    def generate(self) -> str:
+    def static_value(self) -> Union[str, None]:
+        return self.children[0].static_value()
+
+    def generate(self) -> Union[str, None]:
+        if self.static_value() is not None:
+            return None
         description = self.children[0].generate()
         return f"description: {description}"
         
@@ -179,7 +286,12 @@ class FieldPlaceholderParam(Node):
     def evaluate(self, st:SymbolTable) -> None:
         st.setter("__placeholder__", self.children[0].evaluate(st))
 
-    def generate(self) -> str:
+    def static_value(self) -> Union[str, None]:
+        return self.children[0].static_value()
+
+    def generate(self) -> Union[str, None]:
+        if self.static_value() is not None:
+            return None
         placeholder = self.children[0].generate()
         return f'placeholder: {placeholder}'
 
@@ -190,10 +302,52 @@ class FieldOptionsParam(Node):
     def evaluate(self, st:SymbolTable) -> None:
         st.setter("__options__", self.children[0].evaluate(st))
         
-    def generate(self) -> str:
+    def static_value(self) -> Union[List[str], None]:
+        if isinstance(self.children[0], ListValue):
+            return self.children[0].static_values()
+        return None
+        
+    def generate(self) -> Union[str, None]:
+        if self.static_value() is not None:
+            return None
         options = self.children[0].generate()
         return f'options: {options}'
         
+class FieldOptionsSourceParam(Node):
+    options: List[str] = None
+    
+    def __init__(self, void, source:Node):
+        super().__init__("options_source", source)
+    
+    def evaluate(self, st:SymbolTable) -> None:
+        """Lê o arquivo de opções (lista JSON ou uma opção por linha), relativo ao diretório do .form e contido nele."""
+        if Code.source_dir is None:
+            raise EvaluationException("External options sources are disabled, compile with a source directory to enable them")
+        source_dir = os.path.realpath(Code.source_dir)
+        source = os.path.realpath(os.path.join(source_dir, self.children[0].value))
+        if os.path.commonpath([source_dir, source]) != source_dir:
+            raise EvaluationException(f"Options source '{self.children[0].value}' must be inside the form directory")
+        try:
+            with open(source, 'r', encoding="utf-8") as file:
+                content = file.read()
+        except OSError as e:
+            raise EvaluationException(f"Cannot read options source '{source}': {e.strerror}")
+        if source.endswith(".json"):
+            options = json.loads(content)
+            if not isinstance(options, list):
+                raise EvaluationException(f"Options source '{source}' must contain a JSON list")
+            self.options = [str(option) for option in options]
+        else:
+            self.options = [line.strip() for line in content.splitlines() if line.strip()]
+        st.sys_create("__options__", LIST, Symbol(LIST, self.options))
+        
+    def generate(self) -> str:
+        import gzip, hashlib # só necessários com opções externas
+        content = json.dumps(self.options, ensure_ascii=False, separators=(",", ":")).encode()
+        filename = f"options.{hashlib.sha256(content).hexdigest()[:12]}.json"
+        Code.add_asset(f"{filename}.gz", gzip.compress(content, mtime=0))
+        return f"optionsSource: '{Code.add_asset(filename, content)}'"
+        
 class FieldDefaultParam(Node):
     def __init__(self, void, default_value:Node):
         super().__init__("default", default_value)
@@ -201,10 +355,27 @@ class FieldDefaultParam(Node):
     def evaluate(self, st:SymbolTable) -> None:
         st.setter("__value__", self.children[0].evaluate(st))
         
-    def generate(self) -> str:
+    def static_value(self) -> Union[str, None]:
+        return self.children[0].static_value()
+
+    def generate(self) -> Union[str, None]:
+        if self.static_value() is not None:
+            return None
         default_value = self.children[0].generate()
         return f'defaultValue: {default_value}'
 
+class FieldDebounceParam(Node):
+    def __init__(self, void, milliseconds:Node):
+        super().__init__("debounce", milliseconds)
+    
+    def evaluate(self, st:SymbolTable) -> None:
+        milliseconds = self.children[0].evaluate(st)
+        if milliseconds.type != NUMBER or not 0 <= milliseconds.value < float("inf"):
+            raise EvaluationException("Debounce must be a non-negative number of milliseconds")
+        
+    def generate(self) -> str:
+        return f"debounce: {self.children[0].static_value()}" # tempo sem alterações antes de executar o onChange
+
 class CancelOp(Node):
     def __init__(self, *void:Tuple[Node]):
         super().__init__("cancel")
@@ -0,0 +1,122 @@
+import os, json, hashlib
+from typing import Dict, List, Tuple
+
+from .ast_read import parse_AST, ASTException
+from .code_generator import Code, write_atomic
+from .compiler import PARSER, parse_source, CompileException, SemanticException
+from .node import Node, SymbolTable
+from .nodes_basic import RootBlock, Variable
+from .symbol_types import Symbol
+
+SNAPSHOT_SUFFIX = ".snapshot"
+
+class Prelude:
+    """
+    Declarações da raiz compartilhadas por vários formulários (datas, limites, listas de opções...).
+    O .form do prelúdio passa pelo parser uma única vez e o AST (o JSON do parser) é salvo como snapshot;
+    avaliar as declarações a partir dele é barato. Cada formulário só recebe uma cópia dos símbolos antes
+    de ser avaliado (ver PreProcessor) e o código das declarações, gerado uma vez por modo de geração.
+    """
+    loaded: Dict[Tuple[str, int, int], 'Prelude'] = {} # um prelúdio por arquivo e versão, por processo
+
+    def __init__(self, AST_text: str, AST: RootBlock, symbols: Dict[str, Symbol]) -> None:
+        self.AST_text = AST_text
+        self.AST = AST
+        self.symbols = symbols
+        self.code: Dict[Tuple[bool, bool], List[str]] = {} # código gerado, por (numeric_dates, split_forms)
+
+    def open(filename: str, snapshot: bool = True) -> 'Prelude':
+        """
+        Carrega o prelúdio, compilando-o (e regravando o snapshot) apenas quando ele ou o compilador mudaram.
+        Sem `snapshot` nada é lido ou gravado além do próprio .form; o prelúdio compilado fica só na memória do processo.
+        """
+        try:
+            stat = os.stat(filename)
+        except OSError as e:
+            raise CompileException(f"Prelude not found: {filename} ({e})") from e
+        key = (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
+        if key not in Prelude.loaded:
+            with open(filename, 'r') as file:
+                text = file.read()
+            if snapshot:
+                # o AST salvo também depende do parser (flex/bison), compilado à parte do código Python
+                header = (Code.hash_compiler(), parser_digest(), hashlib.blake2b(text.encode(), digest_size=16).hexdigest())
+                prelude = Prelude.load(filename + SNAPSHOT_SUFFIX, header)
+                if prelude is None:
+                    prelude = Prelude.compile(parse_source(text))
+                    prelude.save(filename + SNAPSHOT_SUFFIX, header)
+            else:
+                prelude = Prelude.compile(parse_source(text))
+            Prelude.loaded[key] = prelude
+        return Prelude.loaded[key]
+
+    def compile(AST_text: str) -> 'Prelude':
+        """Avalia as declarações do prelúdio a partir do JSON do AST produzido pelo parser."""
+        from .preprocessor import PreProcessor
+        try:
+            AST = parse_AST(AST_text)
+        except ASTException as e:
+            raise CompileException(str(e)) from e
+        for statement in AST.children:
+            if not isinstance(statement, Variable):
+                raise CompileException(f"Prelude can only contain variable declarations, not '{statement.value}'")
+        try:
+            st = SymbolTable(name="root")
+            PreProcessor.preprocess(st, prelude=False)
+            builtins = set(st.table)
+            AST.evaluate(st)
+            if Node.errors:
+                raise SemanticException(f"{len(Node.errors)} error(s) found in prelude", list(Node.errors))
+        finally:
+            Node.errors.clear()
+            Node.queue.clear()
+        # as posições se referem ao prelúdio, não ao formulário em que o código é gerado
+        stack = [AST]
+        while stack:
+            node = stack.pop()
+            node.location = None
+            stack.extend(child for child in node.children if isinstance(child, Node))
+        return Prelude(AST_text, AST, {key: symbol for key, symbol in st.table.items() if key not in builtins})
+
+    def load(filename: str, header: Tuple[str, ...]) -> 'Prelude':
+        """Lê o snapshot, ou retorna None se ele não existir ou for de outra versão do prelúdio, do parser ou do compilador."""
+        try:
+            with open(filename, 'r', encoding="utf-8") as file:
+                snapshot = json.load(file)
+            if snapshot.get("header") != list(header):
+                return None
+            AST_text = snapshot["AST"]
+        except (OSError, ValueError, AttributeError, KeyError):
+            return None
+        # só JSON, nunca pickle: um snapshot alterado não executa código ao ser lido
+        try:
+            return Prelude.compile(AST_text)
+        except CompileException:
+            return None # snapshot inválido: o prelúdio é compilado de novo
+
+    def save(self, filename: str, header: Tuple[str, ...]) -> None:
+        # gravado de uma vez (ver write_atomic): builds e processos concorrentes nunca leem um snapshot pela metade
+        content = json.dumps({"header": list(header), "AST": self.AST_text}).encode()
+        try:
+            write_atomic(filename, content)
+        except OSError:
+            pass # diretório somente leitura: o prelúdio continua valendo para este processo
+
+    def generate(self) -> None:
+        """Gera o código das declarações, reaproveitando o já gerado no mesmo modo para os formulários seguintes."""
+        if Code.split_forms:
+            Code.root_names.update(self.symbols) # normalmente feito por RootBlock.generate
+        key = (Code.numeric_dates, Code.split_forms)
+        if key not in self.code:
+            start = len(Code.code_instructions)
+            self.AST.generate()
+            self.code[key] = Code.code_instructions[start:]
+        else:
+            Code.code_instructions.extend(self.code[key])
+
+def parser_digest() -> str:
+    try:
+        with open(PARSER, 'rb') as file:
+            return hashlib.blake2b(file.read(), digest_size=16).hexdigest()
+    except OSError:
+        return None # sem parser o prelúdio não é compilado (ver parse_source)
@@ -1,5 +1,19 @@
+from typing import TYPE_CHECKING
+
 from .symbol_table import SymbolTable, Symbol
 
+if TYPE_CHECKING:
+    from .prelude import Prelude
+
 class PreProcessor:
-    def preprocess(st: SymbolTable) -> None:
-        st.create("PAGE", "page", Symbol("page", "..."))
\ No newline at end of file
+    prelude: 'Prelude' = None # declarações compartilhadas por todos os formulários (ver main.py --prelude)
+    
+    def preprocess(st: SymbolTable, prelude: bool = True) -> None:
+        st.create("PAGE", "page", Symbol("page", "..."))
+        if prelude and PreProcessor.prelude is not None:
+            st.table.update(PreProcessor.prelude.symbols)
+            
+    def generate() -> None:
+        """Gera o código das declarações do prelúdio, antes do código do formulário."""
+        if PreProcessor.prelude is not None:
+            PreProcessor.prelude.generate()
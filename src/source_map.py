@@ -0,0 +1,70 @@
+from typing import List, Tuple
+import re, json
+
+BASE64 = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+MARKER = re.compile("\ue000(\\d+)\ue001")
+
+Segment = Tuple[int, int, int] # (coluna gerada, linha no .form, coluna no .form), todas a partir de 0
+
+def unpack_position(position: int) -> Tuple[int, int]:
+    """Desfaz o PACK_POSITION do parser: linha nos bits altos, coluna nos 16 bits baixos."""
+    return position >> 16, position & 0xFFFF
+
+def marker(position: int) -> str:
+    """Marcador inserido no código gerado para indicar a posição de origem do trecho seguinte."""
+    return f"\ue000{position}\ue001"
+
+def shift_markers(code: str, lines: int) -> str:
+    """Desloca em `lines` linhas as posições de todos os marcadores do código (trechos reaproveitados em outro ponto do .form)."""
+    if not lines:
+        return code
+    return MARKER.sub(lambda match: marker(int(match.group(1)) + (lines << 16)), code)
+
+def encode_vlq(value: int) -> str:
+    value = (-value << 1) | 1 if value < 0 else value << 1
+    encoded = ""
+    while True:
+        digit = value & 31
+        value >>= 5
+        if value:
+            digit |= 32
+        encoded += BASE64[digit]
+        if not value:
+            return encoded
+
+def extract_mappings(code: str) -> Tuple[str, List[List[Segment]]]:
+    """Remove os marcadores do código, retornando o código limpo e os segmentos de cada linha gerada."""
+    lines, mappings = [], []
+    for line in code.split("\n"):
+        clean, segments, last = "", [], 0
+        for match in MARKER.finditer(line):
+            clean += line[last:match.start()]
+            source_line, source_column = unpack_position(int(match.group(1)))
+            segments.append((len(clean), source_line - 1, source_column - 1))
+            last = match.end()
+        lines.append(clean + line[last:])
+        mappings.append(segments)
+    return "\n".join(lines), mappings
+
+def source_map(mappings: List[List[Segment]], filename: str, source: str, source_content: str) -> str:
+    """Gera um source map (versão 3) com um único arquivo de origem."""
+    previous_line = previous_column = 0
+    encoded_lines = []
+    for segments in mappings:
+        previous_generated = 0
+        encoded = []
+        for generated_column, source_line, source_column in segments:
+            encoded.append(
+                encode_vlq(generated_column - previous_generated) + encode_vlq(0) +
+                encode_vlq(source_line - previous_line) + encode_vlq(source_column - previous_column)
+            )
+            previous_generated, previous_line, previous_column = generated_column, source_line, source_column
+        encoded_lines.append(",".join(encoded))
+    return json.dumps({
+        "version": 3,
+        "file": filename,
+        "sources": [source],
+        "sourcesContent": [source_content],
+        "names": [],
+        "mappings": ";".join(encoded_lines),
+    }, ensure_ascii=False)
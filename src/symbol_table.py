@@ -1,7 +1,7 @@
 import json
 from typing import Dict
 
-from .symbol_types import Symbol
+from .symbol_types import Symbol, OBJECT
 
 def serialize_SymbolTable(st: 'SymbolTable') -> Dict:
     serialized = {key: symbol for key, symbol in st.table.items() if key != "__childs__"} 
@@ -62,13 +62,17 @@ class SymbolTable:
         raise ValueError(f"Value for '{key}' is not initialized")
         
 
-    def getter(self, key:str) -> Symbol:
-        if key in self.table:
+    def __defines(self, key:str, values_only:bool) -> bool:
+        return key in self.table and not (values_only and self.table[key].type == OBJECT)
+
+    def getter(self, key:str, values_only:bool=False) -> Symbol:
+        """Com `values_only`, formulários e campos são ignorados, como no JS gerado, onde o nome solto é sempre uma variável."""
+        if self.__defines(key, values_only):
             return self.__getter(key)
         
         parent = self.parent
         while parent is not None:
-            if key in parent.table:
+            if parent.__defines(key, values_only):
                 return parent.__getter(key)
             parent = parent.parent
             
@@ -79,14 +83,14 @@ class SymbolTable:
             raise TypeError(f"Type mismatch for '{key}': expected {self.table[key].type}, got {symbol.type}")
         self.table[key] = symbol
     
-    def setter(self, key:str, symbol:Symbol) -> None:
-        if key in self.table:
+    def setter(self, key:str, symbol:Symbol, values_only:bool=False) -> None:
+        if self.__defines(key, values_only):
             self.__setter(key, symbol)
             return
         
         parent = self.parent
         while parent is not None:
-            if key in parent.table:
+            if parent.__defines(key, values_only):
                 parent.__setter(key, symbol)
                 return
             parent = parent.parent
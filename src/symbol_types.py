@@ -1,5 +1,5 @@
 from typing import Union, Tuple
-from datetime import datetime, date, time, timedelta
+from datetime import date, time, timedelta
 
 NUMBER = "number"
 STRING = "string"
@@ -9,11 +9,13 @@ TIME = "time"
 LIST = "list"
 OBJECT = "object"
 
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
 class Date:
     value: date
     
     def __init__(self, value:str) -> None:
-        self.value = datetime.strptime(value, "%Y-%m-%d").date()
+        self.value = date.fromisoformat(value) # mesmo formato de "%Y-%m-%d", sem o custo de importar o _strptime
     
     def __str__(self) -> str:
         return self.value.strftime("%Y-%m-%d")
@@ -65,11 +67,15 @@ class Date:
     
     def dump(self) -> str:
         return self.value.strftime("%Y-%m-%d")
+    
+    def epoch_days(self) -> int:
+        """Dias desde 1970-01-01, a representação das datas no modo numérico do runtime."""
+        return self.value.toordinal() - EPOCH_ORDINAL
 
 
 class Time:
     def __init__(self, value: str) -> None:
-        self.value = datetime.strptime(value, "%H:%M").time()
+        self.value = time.fromisoformat(value)
         
     def __str__(self) -> str:
         return self.value.strftime("%H:%M")
@@ -129,6 +135,10 @@ class Time:
     
     def dump(self) -> str:
         return self.value.strftime("%H:%M")
+    
+    def minutes(self) -> int:
+        """Minutos desde 00:00, a representação dos horários no modo numérico do runtime."""
+        return self.value.hour * 60 + self.value.minute
 
 class Symbol:
     type: str
@@ -152,7 +162,7 @@ class Symbol:
         return Symbol(BOOLEAN, self.value == other.value)
     
     def __ne__(self, other: 'Symbol') -> bool:
-        self.type_check(other)
+        self.__type_check(other)
         return Symbol(BOOLEAN, self.value != other.value)
     
     def __gt__(self, other: 'Symbol') -> bool:
@@ -208,6 +218,12 @@ class Symbol:
         elif (self.type == TIME and other.type == NUMBER):
             return Symbol(TIME, self.value - other.value)
         
+        # como no runtime, a diferença entre datas (em dias) ou horários (em minutos) é um número
+        elif (self.type == DATE and other.type == DATE):
+            return Symbol(NUMBER, self.value - other.value)
+        elif (self.type == TIME and other.type == TIME):
+            return Symbol(NUMBER, self.value.minutes() - other.value.minutes())
+        
         elif self.type != other.type and self.type not in [NUMBER, TIME]:
             raise TypeError(f"Type mismatch: cannot subtract {self.type} and {other.type}")
         
@@ -264,11 +280,20 @@ class Symbol:
             return f"< {self.type.upper()}: {self.value.name} >"
         return f"< {self.type.upper()}: {self.value} >"
     
-DEFAULT_VALUE = {
-    NUMBER: Symbol(NUMBER, 0.0),
-    STRING: Symbol(STRING, ""),
-    BOOLEAN: Symbol(BOOLEAN, False),
-    DATE: Symbol(DATE, Date("1970-01-01")),
-    TIME: Symbol(TIME, Time("00:00")),
-    LIST: Symbol(LIST, []),
-}
\ No newline at end of file
+DEFAULT_TYPES = [NUMBER, STRING, BOOLEAN, DATE, TIME, LIST]
+
+def default_value(symbol_type: str) -> Symbol:
+    """Valor padrão de cada tipo, criado sob demanda (em vez de na importação do módulo)."""
+    if symbol_type == NUMBER:
+        return Symbol(NUMBER, 0.0)
+    elif symbol_type == STRING:
+        return Symbol(STRING, "")
+    elif symbol_type == BOOLEAN:
+        return Symbol(BOOLEAN, False)
+    elif symbol_type == DATE:
+        return Symbol(DATE, Date("1970-01-01"))
+    elif symbol_type == TIME:
+        return Symbol(TIME, Time("00:00"))
+    elif symbol_type == LIST:
+        return Symbol(LIST, [])
+    raise KeyError(symbol_type)
\ No newline at end of file
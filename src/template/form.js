@@ -1,20 +1,36 @@
 class ElementController {
-    constructor(elementId, attribute = "innerHTML", type = "text") {
+    constructor(elementId, attribute = "innerHTML", type = "text", cached = false) {
         this.element = document.getElementById(elementId);
         if (!this.element) {
             throw new Error(`Element with ID '${elementId}' not found.`);
         }
         this.attribute = attribute;
         this.type = type;
+        this.cached = cached;
+        this.cache = undefined;
     }
 
-    get() { 
+    read() { 
         if (this.type === "boolean") return this.element[this.attribute]
-        else if (this.type === "date") return new DateWrapper(this.element[this.attribute]);
-        else if (this.type === "time") return new TimeWrapper(this.element[this.attribute]);
+        else if (this.type === "date") return numericDates ? parseDate(this.element[this.attribute]) : new DateWrapper(this.element[this.attribute]);
+        else if (this.type === "time") return numericDates ? parseTime(this.element[this.attribute]) : new TimeWrapper(this.element[this.attribute]);
+        else if (this.type === "number") return this.element[this.attribute] === "" ? 0 : Number(this.element[this.attribute]);
         return this.element?.[this.attribute] || ""; 
     }
-    set(value) { if (this.element) this.element[this.attribute] = value.toString(); }
+
+    get() {
+        if (!this.cached) return this.read();
+        if (this.cache === undefined) this.cache = this.read();
+        return this.cache;
+    }
+    set(value) {
+        if (numericDates && typeof value === "number" && this.type === "date") value = formatDate(value);
+        else if (numericDates && typeof value === "number" && this.type === "time") value = formatTime(value);
+        if (this.element) this.element[this.attribute] = value.toString();
+        this.invalidate();
+        if (this.onSet) this.onSet();
+    }
+    invalidate() { this.cache = undefined; }
 }
 
 class ListElementController {
@@ -31,8 +47,9 @@ class ListElementController {
     getItems() { return Array.from(this.element.children).map(item => item.innerHTML); }
 
     setItems(items) {
-        this.element.innerHTML = "";
-        items.forEach(item => this.addItem(item));
+        const fragment = document.createDocumentFragment();
+        items.forEach(item => fragment.appendChild(this.createItemElement(item)));
+        this.element.replaceChildren(fragment);
     }
 
     addItem(value) {
@@ -90,12 +107,63 @@ class ListElementController {
     set(index, value) {  this.updateItem(index, value); }
 }
 
+// opções de Select vindas de um arquivo externo: baixadas só quando o campo é usado e exibidas
+// aos poucos, no máximo MAX_RENDERED_OPTIONS por vez, conforme o texto digitado no filtro
+const MAX_RENDERED_OPTIONS = 200;
+
+async function fetchOptions(url) {
+    if (globalThis.DecompressionStream) {
+        try {
+            const response = await fetch(`${url}.gz`);
+            if (response.ok) return JSON.parse(await new Response(response.body.pipeThrough(new DecompressionStream("gzip"))).text());
+        } catch (error) {} // servidor já descomprimiu (Content-Encoding) ou não serve o .gz: usa o JSON
+    }
+    return (await fetch(url)).json();
+}
+
+class OptionsSource {
+    constructor(field, url) {
+        this.field = field;
+        this.url = url;
+        this.items = null;
+        this.loading = null;
+        this.filter = document.getElementById(`${field.name}-filter`);
+        const load = () => this.load();
+        [field.input, this.filter].forEach(element => {
+            element.addEventListener("focus", load, { once: true });
+            element.addEventListener("pointerenter", load, { once: true });
+        });
+        this.filter.addEventListener("input", () => this.load().then(() => this.render()));
+    }
+
+    load() {
+        this.loading ??= fetchOptions(this.url).then(items => {
+            this.items = items;
+            this.render();
+        });
+        return this.loading;
+    }
+
+    render() {
+        const query = this.filter.value.trim().toLowerCase();
+        const selected = this.field.input.value;
+        const matches = selected ? [selected] : [];
+        for (const item of this.items) {
+            if (matches.length >= MAX_RENDERED_OPTIONS) break;
+            if (item !== selected && (!query || item.toLowerCase().includes(query))) matches.push(item);
+        }
+        this.field.options.setItems(matches);
+        this.field.input.value = selected;
+    }
+}
+
 export class FormField {
     constructor(fieldName, type, initial = {}) {
         this.name = fieldName;
         this.type = type;
         this.input = document.getElementById(fieldName);
 
+        // valores literais já vêm pré-renderizados no HTML; aqui só entram os dinâmicos
         this.title = new ElementController(`${fieldName}-title`);
         if (initial.title) this.title.set(initial.title);
 
@@ -109,27 +177,111 @@ export class FormField {
         this.required = new ElementController(fieldName, "required", "boolean");
         if (initial.required) this.required.set(initial.required);
 
-        this.value = new ElementController(fieldName, "value", type);
+        if (type === "select") {
+            this.options = new ListElementController(fieldName, "option");
+            // opções constantes já vêm renderizadas no HTML pelo compilador
+            if (initial.options) this.options.setItems(initial.options);
+            else if (initial.optionsSource) this.optionsSource = new OptionsSource(this, initial.optionsSource);
+        }
+
+        this.value = new ElementController(fieldName, "value", type, true);
         if (initial.defaultValue) this.value.set(initial.defaultValue);
 
-        if (type === "select" && initial.options) {
-            this.options = new ListElementController(fieldName, "option");
-            this.options.setItems(initial.options);
+        // campos cujo valor é lido pelo onChange (calculado pelo compilador) e campos que leem este (preenchido pelo Form)
+        this.reads = initial.reads || [];
+        // o onChange lê variáveis ou atributos (title, options...) que mudam sem alterar nenhum campo
+        this.volatile = Boolean(initial.volatile);
+        this.dependents = [];
+        this.onChange = initial.onChange;
+        this.debounce = initial.debounce ?? DEFAULT_DEBOUNCE;
+        this.valid = undefined; // resultado do último onChange; undefined enquanto o campo estiver "sujo"
+        this.timer = null;
+        this.value.onSet = () => this.changed();
+        this.input.addEventListener("input", () => {
+            this.value.invalidate();
+            this.changed();
+        });
+    }
+
+    changed() {
+        if (runningHandler) {
+            // valor alterado por um onChange: só marca os campos como sujos (revalidados no submit), senão
+            // dois onChange que alteram o campo um do outro se reagendariam indefinidamente
+            this.dirty();
+            this.dependents.forEach(dependent => dependent.dirty());
+            return;
         }
+        this.schedule();
+        this.dependents.forEach(dependent => dependent.schedule());
+    }
+
+    dirty() { if (this.onChange) this.valid = undefined; }
+
+    // marca o campo como sujo e agenda o onChange para depois de `debounce` ms sem alterações, em tempo ocioso
+    schedule() {
+        if (!this.onChange) return;
+        this.valid = undefined;
+        clearTimeout(this.timer);
+        this.timer = setTimeout(() => {
+            this.timer = null;
+            scheduleIdle(this);
+        }, this.debounce);
+    }
+
+    reset() {
+        clearTimeout(this.timer);
+        this.timer = null;
+        idleQueue.delete(this);
+        this.value.invalidate();
+        this.valid = undefined;
+    }
 
-        if (initial.onChange) {
-            this.onChange = initial.onChange;
-            this.input.addEventListener("input", () => {
-                if (this.onChange && !this.onChange()) {
-                    this.input.classList.add("error");
-                } else if (this.input.classList.contains("error")) {
-                    this.input.classList.remove("error");
-                }
-            });
+    validate() {
+        clearTimeout(this.timer);
+        this.timer = null;
+        idleQueue.delete(this);
+        const outer = runningHandler;
+        runningHandler = this;
+        try {
+            this.valid = !this.onChange || Boolean(this.onChange());
+        } finally {
+            runningHandler = outer;
         }
+        if (!this.valid) {
+            this.input.classList.add("error");
+        } else if (this.input.classList.contains("error")) {
+            this.input.classList.remove("error");
+        }
+        return this.valid;
     }
+
+    // usado no submit: só executa o onChange se o campo (ou um campo que ele lê) mudou desde a última validação
+    isValid() { return this.volatile ? this.validate() : this.valid ?? this.validate(); }
 };
 
+// campo cujo onChange está rodando (ver FormField.changed)
+let runningHandler = null;
+
+// onChange prontos para rodar (já passado o debounce), executados quando o navegador estiver ocioso
+const DEFAULT_DEBOUNCE = 150;
+const idleQueue = new Set();
+let idleHandle = null;
+const requestIdle = globalThis.requestIdleCallback ?? (callback => setTimeout(() => callback({ timeRemaining: () => 1 }), 1));
+
+function runIdle(deadline) {
+    idleHandle = null;
+    for (const field of idleQueue) {
+        field.validate(); // também o remove da fila
+        if (deadline.timeRemaining() <= 0) break;
+    }
+    if (idleQueue.size) idleHandle = requestIdle(runIdle, { timeout: 200 });
+}
+
+function scheduleIdle(field) {
+    idleQueue.add(field);
+    if (idleHandle === null) idleHandle = requestIdle(runIdle, { timeout: 200 });
+}
+
 export class Form {
     constructor(formName, { fields = [], onSubmit = () => {} } = {}) {
         this.form = document.getElementById(formName);
@@ -140,17 +292,22 @@ export class Form {
             this[field.name] = field; 
         });
 
+        // grafo de dependências: campo -> campos cujo onChange lê o seu valor
+        fields.forEach(field => field.reads.forEach(name => {
+            if (name === field.name || !this.fields[name]) return;
+            this.fields[name].dependents.push(field);
+        }));
+
         this.onSubmit = onSubmit;
         this.form.addEventListener("submit", (event) => {
             event.preventDefault();
-            const allValid = Object.values(this.fields).every(field => {
-                return !field.onChange || field.onChange();
-            });
+            const allValid = Object.values(this.fields).every(field => field.isValid());
             if (allValid && (!this.onSubmit || this.onSubmit())) {
                 if (this.submitDisplay.classList.contains("error")) this.submitDisplay.classList.remove("error");
                 this.submitDisplay.textContent = "Form submitted successfully! (Check console for data)";
                 const formData = this.getFormData();
                 this.form.reset();
+                Object.values(this.fields).forEach(field => field.reset());
                 console.log("Form submitted with data:", formData);
             } else {
                 if (!this.submitDisplay.classList.contains("error")) this.submitDisplay.classList.add("error");
@@ -176,8 +333,46 @@ export class Form {
     }
 }
 
+// --split-forms: o módulo de cada formulário só é importado quando ele aparece na tela ou recebe foco
+export function lazyForm(formName, load) {
+    const form = document.getElementById(formName);
+    let loading = null;
+    const start = () => {
+        if (loading) return loading;
+        form.removeEventListener("focusin", start);
+        observer?.disconnect();
+        loading = load().then(() => form.removeEventListener("submit", guard));
+        return loading;
+    };
+    // envio antes do carregamento: espera o módulo e reenvia, agora tratado pelo próprio Form
+    const guard = (event) => {
+        event.preventDefault();
+        start().then(() => form.requestSubmit());
+    };
+    form.addEventListener("submit", guard);
+    form.addEventListener("focusin", start);
+    const observer = globalThis.IntersectionObserver
+        ? new IntersectionObserver(entries => { if (entries.some(entry => entry.isIntersecting)) start(); })
+        : null;
+    if (observer) observer.observe(form);
+    else start();
+}
+
+// escritas de display pendentes, aplicadas todas juntas no próximo frame
+const pendingDisplays = new Map();
+let displayFrame = null;
+
+function flushDisplays() {
+    pendingDisplays.forEach((text, on) => {
+        document.getElementById(`${on}-display`).innerHTML = text;
+    });
+    pendingDisplays.clear();
+    displayFrame = null;
+}
+
 export function display(on, text) {
-	document.getElementById(`${on}-display`).innerHTML = text.toString();
+    pendingDisplays.set(on, text.toString());
+    if (displayFrame === null) displayFrame = requestAnimationFrame(flushDisplays);
 }
 
 export class DateWrapper {
@@ -264,14 +459,46 @@ export class TimeWrapper {
     }
 }
 
-Object.prototype.equals = function (other) {
-    return this.valueOf() === other.valueOf();
-};
+// modo numérico (compilado com --numeric-dates): datas são dias desde 1970-01-01 e horários são minutos
+// desde 00:00, convertidos de/para texto apenas ao ler e escrever no DOM
+let numericDates = false;
+
+export function useNumericDates() { numericDates = true; }
+
+export function parseDate(text) {
+    const [year, month, day] = text.split("-").map(Number);
+    return Date.UTC(year, month - 1, day) / 86400000;
+}
+
+export function formatDate(days) { return new Date(days * 86400000).toISOString().slice(0, 10); }
+
+export function parseTime(text) {
+    const [hours, minutes] = text.split(":").map(Number);
+    return hours * 60 + minutes;
+}
+
+export function formatTime(minutes) {
+    return `${String(Math.floor(minutes / 60)).padStart(2, "0")}:${String(minutes % 60).padStart(2, "0")}`;
+}
+
+export function wrapMinutes(minutes) { return ((minutes % 1440) + 1440) % 1440; }
 
-Object.prototype.add = function (other) {
-    return this.valueOf() + other.valueOf();
+// operações genéricas, usadas só quando o compilador não conseguiu inferir os tipos dos operandos
+export function _add(left, right) {
+    if (typeof left === "string" || typeof right === "string") return String(left) + String(right);
+    if (left instanceof DateWrapper || left instanceof TimeWrapper) return left.add(right);
+    if (right instanceof DateWrapper || right instanceof TimeWrapper) return right.add(left);
+    if (Array.isArray(left)) return left.concat(right);
+    return left + right;
 }
 
-Object.prototype.subtract = function (other) {
-    return this.valueOf() - other.valueOf(); 
-};
\ No newline at end of file
+export function _subtract(left, right) {
+    if (left instanceof DateWrapper && typeof right === "number") return left.add(-right);
+    if (left instanceof DateWrapper || left instanceof TimeWrapper) return left.subtract(right);
+    return left - right;
+}
+
+export function _equals(left, right) {
+    if (left instanceof DateWrapper || left instanceof TimeWrapper) return left.equals(right);
+    return left === right;
+}
@@ -0,0 +1,41 @@
+import os, shutil, subprocess
+
+import pytest
+
+from src.compiler import PARSER
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+RUNTIME = os.path.join(ROOT, "src", "template", "form.js")
+
+requires_parser = pytest.mark.skipif(not os.path.exists(PARSER), reason="parser not built (see README)")
+
+# DOM mínimo para executar o runtime (form.js) no Node: elementos com atributos, eventos e classes
+FAKE_DOM = """
+const elements = {};
+class FakeElement {
+    constructor(id) { this.id = id; this.value = ""; this.innerHTML = ""; this.textContent = ""; this.listeners = {}; this.children = []; this.classes = new Set(); }
+    get classList() { const classes = this.classes; return { add: c => classes.add(c), remove: c => classes.delete(c), contains: c => classes.has(c) }; }
+    addEventListener(type, listener) { (this.listeners[type] ??= []).push(listener); }
+    removeEventListener(type, listener) { this.listeners[type] = (this.listeners[type] || []).filter(other => other !== listener); }
+    fire(type) { const event = { preventDefault() {} }; (this.listeners[type] || []).forEach(listener => listener(event)); }
+    reset() {}
+}
+globalThis.document = { getElementById: id => elements[id] ??= new FakeElement(id) };
+globalThis.requestAnimationFrame = callback => setTimeout(callback, 0);
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+const input = (id, value) => { const element = document.getElementById(id); element.value = value; element.fire("input"); };
+"""
+
+@pytest.fixture
+def run_runtime(tmp_path):
+    """Executa `script` (módulo ES com o runtime importado como `runtime`) no Node, retornando as linhas impressas."""
+    node = shutil.which("node")
+    if node is None:
+        pytest.skip("node not available")
+    shutil.copy(RUNTIME, tmp_path / "form.mjs")
+    def run(script: str) -> list:
+        (tmp_path / "test.mjs").write_text(FAKE_DOM + "const runtime = await import('./form.mjs');\n" + script)
+        result = subprocess.run([node, str(tmp_path / "test.mjs")], capture_output=True, text=True, timeout=30)
+        assert result.returncode == 0, result.stderr
+        return result.stdout.split("\n")[:-1]
+    return run
@@ -0,0 +1,46 @@
+import asyncio, threading
+from concurrent.futures import ThreadPoolExecutor
+
+import src.async_compiler
+from src.async_compiler import AsyncCompiler
+
+def test_cancel_keeps_slot_until_job_ends(monkeypatch):
+    started, finish = threading.Event(), threading.Event()
+    def compile_AST(*args):
+        started.set()
+        finish.wait(10)
+    async def parse(text: str) -> str:
+        return "{}"
+    monkeypatch.setattr(src.async_compiler, "compile_AST", compile_AST)
+
+    async def scenario() -> None:
+        compiler = AsyncCompiler(workers=1, max_pending=1)
+        compiler.executor.shutdown()
+        compiler.executor = ThreadPoolExecutor(max_workers=1)
+        compiler.parse = parse
+        task = asyncio.create_task(compiler.compile("Form f {}"))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert compiler.pending.locked() # a compilação cancelada continua rodando no pool
+        finish.set()
+        await asyncio.wait_for(compiler.pending.acquire(), 5)
+        compiler.pending.release()
+        compiler.close()
+    asyncio.run(scenario())
+
+def test_parse_failure_releases_slot():
+    async def parse(text: str) -> str:
+        raise ValueError("parser failed")
+    async def scenario() -> None:
+        compiler = AsyncCompiler(workers=1, max_pending=1)
+        compiler.parse = parse
+        for _ in range(2):
+            try:
+                await compiler.compile("Form f {}")
+            except ValueError:
+                pass
+        assert not compiler.pending.locked()
+        compiler.close()
+    asyncio.run(scenario())
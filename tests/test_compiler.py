@@ -0,0 +1,72 @@
+import os, threading
+
+from src.compiler import compile_source
+from src.prelude import SNAPSHOT_SUFFIX
+
+from conftest import ROOT, requires_parser
+
+pytestmark = requires_parser
+
+PRELUDE = 'Date abertura = "2025-01-06"\nNumber limite = 3\n'
+SOURCE = """Form pedido {
+    Field itens Number {
+        onChange {
+            if (itens.value > limite) then {
+                on[itens]display("No máximo " + limite)
+                cancel
+            }
+        }
+    }
+}
+"""
+
+def test_prelude_compiled_in_memory(tmp_path):
+    prelude = tmp_path / "comum.form"
+    prelude.write_text(PRELUDE)
+    artifacts = compile_source(SOURCE, prelude=str(prelude))
+    assert "limite" in artifacts.js
+    assert os.listdir(tmp_path) == ["comum.form"] # nenhum snapshot gravado
+    assert not os.path.exists(str(prelude) + SNAPSHOT_SUFFIX)
+
+SHADOWED = """Number total = 0
+
+Form pedido {
+    Field total Number {
+        onChange {
+            total = total.value * 2
+            on[total]display("Dobro: " + total)
+        }
+    }
+}
+"""
+
+def test_bare_identifiers_skip_forms_and_fields():
+    # `total` solto é a variável da raiz, como no JS gerado; `total.value` é o campo
+    js = compile_source(SHADOWED, numeric_dates=True).js
+    assert "total = pedido.total.value.get() * 2;" in js
+    assert "display('total', (\"Dobro: \" + total));" in js
+
+def test_exemple_compiles_with_numeric_dates():
+    with open(os.path.join(ROOT, "exemple.form")) as file:
+        js = compile_source(file.read(), numeric_dates=True).js
+    assert "idade = (hoje - apresentacao.data_nascimento.value.get()) / 365;" in js
+
+def test_concurrent_compiles():
+    with open(os.path.join(ROOT, "exemple.form")) as file:
+        sources = [file.read(), SOURCE.replace("limite", "5")]
+    expected = [compile_source(source).js for source in sources]
+    results, errors = {}, []
+    def compile_many(index: int) -> None:
+        try:
+            for _ in range(5):
+                results.setdefault(index, set()).add(compile_source(sources[index % 2]).js)
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=compile_many, args=(index,)) for index in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    for index, outputs in results.items():
+        assert outputs == {expected[index % 2]}
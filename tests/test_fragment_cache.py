@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from src.compiler import compile_source
+from src.fragment_cache import FragmentCache
+
+from conftest import ROOT, requires_parser
+
+pytestmark = requires_parser
+
+DATES = """Date inicio = "2025-06-10"
+Time abertura = "08:30"
+Number prazo = 10
+
+Form agenda {
+    Field entrega Date {
+        default = inicio
+        onChange {
+            if (entrega.value < inicio + prazo) then {
+                on[entrega]display("Entrega antes de " + (inicio + prazo))
+                cancel
+            }
+        }
+    }
+    Field retirada Date {
+        default = inicio
+        onChange {
+            if (retirada.value < inicio + prazo) then {
+                on[retirada]display("Entrega antes de " + (inicio + prazo))
+                cancel
+            }
+        }
+    }
+    Field hora Time {
+        onChange {
+            if (hora.value < abertura - 30) then {
+                on[hora]display(abertura)
+            }
+        }
+    }
+}
+"""
+
+@pytest.fixture
+def fragment_cache():
+    capacity = FragmentCache.capacity
+    FragmentCache.fragments.clear()
+    yield FragmentCache
+    FragmentCache.capacity = capacity
+    FragmentCache.fragments.clear()
+
+@pytest.mark.parametrize("numeric_dates", [False, True])
+def test_fragment_cache_does_not_change_output(fragment_cache, numeric_dates):
+    if numeric_dates:
+        source = DATES
+    else:
+        with open(os.path.join(ROOT, "exemple.form"), 'r') as file:
+            source = file.read()
+    fragment_cache.capacity = 0
+    uncached = compile_source(source, numeric_dates=numeric_dates).files
+    fragment_cache.capacity = 1024
+    first = compile_source(source, numeric_dates=numeric_dates).files
+    second = compile_source(source, numeric_dates=numeric_dates).files
+    assert uncached == first == second
+    assert fragment_cache.hits > 0
@@ -0,0 +1,33 @@
+import os
+
+from src.compiler import parse_source
+from src.ast_read import parse_AST, NodePool
+from src.code_generator import Code
+from src.node import Node, SymbolTable
+from src.preprocessor import PreProcessor
+
+from conftest import ROOT, requires_parser
+
+pytestmark = requires_parser
+
+def generate(AST_text: str, pool: NodePool = None) -> dict:
+    AST = parse_AST(AST_text, pool)
+    Code.numeric_dates = False
+    try:
+        st = SymbolTable(name="root")
+        PreProcessor.preprocess(st)
+        AST.evaluate(st)
+        assert not Node.errors
+        AST.generate()
+        return Code.render("form")
+    finally:
+        Code.reset()
+        Node.errors.clear()
+        Node.queue.clear()
+
+def test_hash_consing_does_not_change_output():
+    with open(os.path.join(ROOT, "exemple.form"), 'r') as file:
+        AST_text = parse_source(file.read())
+    pool = NodePool()
+    assert generate(AST_text) == generate(AST_text, pool)
+    assert pool.dedup_ratio() > 0
@@ -0,0 +1,50 @@
+import json, os
+
+import pytest
+
+from src.compiler import ParserException, SemanticException, compile_source
+
+from conftest import requires_parser
+
+pytestmark = requires_parser
+
+def form(source: str) -> str:
+    return f'Form f {{\n    Field cidade Select {{\n        options from "{source}"\n    }}\n}}\n'
+
+@pytest.fixture
+def project(tmp_path):
+    """Diretório do .form com `cidades.json`, e um `segredo.txt` fora dele."""
+    (tmp_path / "forms").mkdir()
+    (tmp_path / "forms" / "cidades.json").write_text(json.dumps(["Recife", "Olinda"]))
+    (tmp_path / "segredo.txt").write_text("senha\n")
+    return tmp_path
+
+def compile_error(source: str, source_dir: str) -> str:
+    with pytest.raises(SemanticException) as error:
+        compile_source(form(source), source_dir=source_dir)
+    assert len(error.value.diagnostics) == 1
+    return error.value.diagnostics[0]
+
+def test_reads_options_inside_source_dir(project):
+    artifacts = compile_source(form("cidades.json"), source_dir=str(project / "forms"))
+    assets = [content for name, content in artifacts.files.items() if name.startswith("options.") and name.endswith(".json")]
+    assert [json.loads(content) for content in assets] == [["Recife", "Olinda"]]
+
+@pytest.mark.parametrize("source", ["../segredo.txt", "{root}/segredo.txt"])
+def test_rejects_paths_outside_source_dir(project, source):
+    error = compile_error(source.format(root=project), str(project / "forms"))
+    assert "must be inside the form directory" in error
+
+def test_rejects_symlink_leaving_source_dir(project):
+    os.symlink(project / "segredo.txt", project / "forms" / "atalho.txt")
+    assert "must be inside the form directory" in compile_error("atalho.txt", str(project / "forms"))
+
+def test_disabled_without_source_dir(project):
+    assert "External options sources are disabled" in compile_error("cidades.json", None)
+
+def test_from_is_only_a_keyword_after_options(project):
+    js = compile_source('Number from = 1\nfrom = from + 1\n' + form("cidades.json"), source_dir=str(project / "forms")).js
+    assert "let from = 1;" in js
+    with pytest.raises(ParserException) as error:
+        compile_source(form("cidades.json").replace("options from", "options in"))
+    assert error.value.diagnostics == ["<stdin>:3:17: expected 'from' after 'options', got 'in'"]
@@ -0,0 +1,70 @@
+import subprocess
+
+import pytest
+
+from src.ast_read import parse_AST, read_AST_stream
+from src.compiler import PARSER, ParserException, compile_source, parse_source
+
+from conftest import requires_parser
+
+FORM = "Number n = 1\n\nForm f {\n    Field a Number {\n        required\n    }\n}\n"
+
+def parse(*args: str, stdin: str = None) -> subprocess.CompletedProcess:
+    return subprocess.run([PARSER, *args], input=stdin, capture_output=True, text=True)
+
+@requires_parser
+def test_stream_parses_many_files_in_one_run(tmp_path):
+    filenames = []
+    for i in range(3):
+        filename = tmp_path / f"form{i}.form"
+        filename.write_text(FORM.replace("Form f", f"Form f{i}"))
+        filenames.append(str(filename))
+    result = parse("--stream", *filenames)
+    assert result.returncode == 0
+    ASTs = read_AST_stream(result.stdout)
+    assert list(ASTs) == filenames
+    assert [AST.children[1].children[0].value for AST in ASTs.values()] == ["f0", "f1", "f2"]
+    assert not list(tmp_path.glob("*.json")) # nada é gravado ao lado dos fontes no modo stream
+
+@requires_parser
+def test_stream_reads_file_list_from_stdin_and_isolates_failures(tmp_path):
+    good, bad = tmp_path / "good.form", tmp_path / "bad.form"
+    good.write_text(FORM)
+    bad.write_text("Form {\n")
+    result = parse("--stream", "-", stdin=f"{bad}\n{good}\n")
+    assert result.returncode == 1
+    assert list(read_AST_stream(result.stdout)) == [str(good)]
+
+@requires_parser
+def test_recovers_and_reports_every_syntax_error():
+    with pytest.raises(ParserException) as error:
+        compile_source("Number a = \nNumber b = 2\nNumber = 3\nString c = )\n")
+    lines = [diagnostic.split(":")[1] for diagnostic in error.value.diagnostics]
+    assert lines == ["1", "3", "4"]
+
+@requires_parser
+def test_invalid_character_fails_the_file(tmp_path):
+    source = tmp_path / "form.form"
+    source.write_text('Number a = 1\nString b = "x" @\nNumber c = 2\n')
+    result = parse("--stream", str(source))
+    assert result.returncode == 1
+    assert f"[!] {source}:2:16: invalid character '@'" in result.stderr.splitlines()
+    assert not read_AST_stream(result.stdout)
+    with pytest.raises(ParserException) as error:
+        compile_source("Number a = 1 é\n")
+    assert error.value.diagnostics == ["<stdin>:1:14: invalid character 'é'"]
+
+@requires_parser
+def test_times_up_to_23_59_are_time_literals():
+    AST = parse_AST(parse_source('Time a = "21:30"\nTime b = "23:59"\nString c = "24:00"\n'))
+    assert [type(variable.children[1]).__name__ for variable in AST.children] == ["TimeValue", "TimeValue", "StringValue"]
+
+@requires_parser
+def test_debounce_is_only_a_keyword_among_field_parameters():
+    source = "Number debounce = 5\n\nForm f {\n    Field a Number {\n        debounce = 300\n        onChange {\n            debounce = a.value\n        }\n    }\n}\n"
+    js = compile_source(source).js
+    assert "let debounce = 5;" in js
+    assert "{debounce: 300, onChange:" in js
+    with pytest.raises(ParserException) as error:
+        compile_source(source.replace("debounce = 300", "delay = 300"))
+    assert error.value.diagnostics == ["<stdin>:5:9: unknown field parameter 'delay'"]
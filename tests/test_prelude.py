@@ -0,0 +1,78 @@
+import json, os
+
+import pytest
+
+import src.prelude
+from src.compiler import compile_source
+from src.prelude import Prelude, SNAPSHOT_SUFFIX
+
+from conftest import requires_parser
+
+pytestmark = requires_parser
+
+PRELUDE = 'Number limite = 3\nDate inicio = "2025-01-06"\n'
+FORM = 'Form f {\n    Field a Number {\n        onChange {\n            if (a.value > limite) then {\n                cancel\n            }\n        }\n    }\n}\n'
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Conta as execuções do parser feitas pelo prelúdio."""
+    calls = []
+    parse_source = src.prelude.parse_source
+    def counting(text: str) -> str:
+        calls.append(text)
+        return parse_source(text)
+    monkeypatch.setattr(src.prelude, "parse_source", counting)
+    yield calls
+    Prelude.loaded.clear()
+
+@pytest.fixture
+def prelude(tmp_path):
+    filename = tmp_path / "comum.form"
+    filename.write_text(PRELUDE)
+    return filename
+
+def reopen(filename) -> Prelude:
+    Prelude.loaded.clear() # como em um novo processo
+    return Prelude.open(str(filename))
+
+def test_snapshot_is_json_and_reused(prelude, parses):
+    first = reopen(prelude)
+    snapshot = json.loads((prelude.parent / ("comum.form" + SNAPSHOT_SUFFIX)).read_text())
+    assert set(snapshot) == {"header", "AST"}
+    second = reopen(prelude)
+    assert len(parses) == 1
+    assert set(first.symbols) == set(second.symbols) == {"limite", "inicio"}
+
+def test_snapshot_invalidated_when_prelude_changes(prelude, parses):
+    reopen(prelude)
+    prelude.write_text(PRELUDE + "Number maximo = 10\n")
+    assert "maximo" in reopen(prelude).symbols
+    assert len(parses) == 2
+
+def test_snapshot_invalidated_when_parser_changes(prelude, parses, monkeypatch):
+    reopen(prelude)
+    monkeypatch.setattr(src.prelude, "parser_digest", lambda: "outro parser")
+    reopen(prelude)
+    assert len(parses) == 2
+
+def test_corrupt_snapshot_is_recompiled(prelude, parses):
+    reopen(prelude)
+    snapshot = prelude.parent / ("comum.form" + SNAPSHOT_SUFFIX)
+    content = json.loads(snapshot.read_text())
+    snapshot.write_text(json.dumps({"header": content["header"], "AST": "[1, 2"}))
+    assert set(reopen(prelude).symbols) == {"limite", "inicio"}
+    assert len(parses) == 2
+
+@pytest.mark.parametrize("split_forms", [False, True])
+def test_generated_prelude_code_is_reused(prelude, parses, monkeypatch, split_forms):
+    first = compile_source(FORM, prelude=str(prelude), split_forms=split_forms).files
+    loaded, = [loaded for key, loaded in Prelude.loaded.items() if key[0] == str(prelude)]
+    monkeypatch.setattr(loaded.AST, "generate", lambda: pytest.fail("prelude generated again"))
+    second = compile_source(FORM, prelude=str(prelude), split_forms=split_forms).files
+    assert first == second
+    if split_forms:
+        assert "root.limite = 3;" in first["common.js"]
+        assert "root.limite" in first["form-f.js"]
+    else:
+        assert first["script.js"].index("let limite = 3;") < first["script.js"].index("const f = new Form(")
+    assert not os.path.exists(str(prelude) + SNAPSHOT_SUFFIX)
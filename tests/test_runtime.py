@@ -0,0 +1,53 @@
+def test_field_value_is_cached_until_input(run_runtime):
+    output = run_runtime("""
+const field = new runtime.FormField('a', 'number', {});
+input('a', '1');
+const element = document.getElementById('a');
+console.log(field.value.get());
+element.value = '2';
+console.log(field.value.get());
+element.fire('input');
+console.log(field.value.get());
+""")
+    assert output == ["1", "1", "2"]
+
+def test_change_reruns_only_dependent_handlers(run_runtime):
+    output = run_runtime("""
+const runs = { a: 0, b: 0, c: 0 };
+const a = new runtime.FormField('a', 'number', { onChange: () => ++runs.a, reads: ['a'] });
+const b = new runtime.FormField('b', 'number', { onChange: () => ++runs.b, reads: ['a', 'b'] });
+const c = new runtime.FormField('c', 'number', { onChange: () => ++runs.c, reads: ['c'] });
+new runtime.Form('f', { fields: [a, b, c] });
+console.log(a.dependents.map(field => field.name).join(','));
+input('a', '1');
+await sleep(300);
+console.log(JSON.stringify(runs));
+""")
+    assert output == ["b", '{"a":1,"b":1,"c":0}']
+
+def test_debounce_runs_handler_once_after_quiet_period(run_runtime):
+    output = run_runtime("""
+let runs = 0;
+const a = new runtime.FormField('a', 'number', { onChange: () => ++runs, reads: ['a'], debounce: 100 });
+for (const value of ['1', '12', '123']) {
+    input('a', value);
+    await sleep(30);
+}
+console.log(runs);
+await sleep(250);
+console.log(runs, a.valid);
+""")
+    assert output == ["0", "1 true"]
+
+def test_handlers_setting_each_other_do_not_loop(run_runtime):
+    output = run_runtime("""
+const runs = { a: 0, b: 0 };
+const a = new runtime.FormField('a', 'number', { onChange: () => { ++runs.a; b.value.set(a.value.get() + 1); return true; }, reads: ['a'] });
+const b = new runtime.FormField('b', 'number', { onChange: () => { ++runs.b; a.value.set(b.value.get() + 1); return true; }, reads: ['b'] });
+new runtime.Form('f', { fields: [a, b] });
+input('a', '1');
+await sleep(1000);
+console.log(JSON.stringify(runs), b.value.get(), b.valid);
+console.log(b.isValid(), JSON.stringify(runs)); // o campo alterado pelo onChange é revalidado no submit
+""")
+    assert output == ['{"a":1,"b":0} 2 undefined', 'true {"a":1,"b":1}']
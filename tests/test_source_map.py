@@ -0,0 +1,44 @@
+import json
+
+from src.source_map import BASE64, encode_vlq, marker, shift_markers, extract_mappings, source_map
+
+def decode_vlq(encoded: str) -> list:
+    values, value, shift = [], 0, 0
+    for char in encoded:
+        digit = BASE64.index(char)
+        value |= (digit & 31) << shift
+        shift += 5
+        if not digit & 32:
+            values.append(-(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    return values
+
+def test_vlq_known_values():
+    assert encode_vlq(0) == "A"
+    assert encode_vlq(1) == "C"
+    assert encode_vlq(-1) == "D"
+    assert encode_vlq(16) == "gB"
+    assert encode_vlq(-16) == "hB"
+
+def test_vlq_round_trip():
+    values = list(range(-1100, 1100)) + [2**20, -(2**20), 2**31 - 1]
+    assert decode_vlq("".join(encode_vlq(value) for value in values)) == values
+
+def test_source_map_round_trip():
+    code = f"{marker((1 << 16) | 1)}let a = 1;\n\n  {marker((3 << 16) | 5)}b = a;{marker((4 << 16) | 2)} c();"
+    clean, mappings = extract_mappings(code)
+    assert clean == "let a = 1;\n\n  b = a; c();"
+    decoded = json.loads(source_map(mappings, "script.js", "form.form", ""))["mappings"].split(";")
+    assert len(decoded) == 3 and decoded[1] == ""
+    segments, previous = [], [0, 0, 0, 0]
+    for line in decoded:
+        previous[0] = 0
+        for segment in filter(None, line.split(",")):
+            previous = [total + delta for total, delta in zip(previous, decode_vlq(segment))]
+            segments.append((previous[0], previous[2], previous[3]))
+    assert segments == [(0, 0, 0), (2, 2, 4), (8, 3, 1)]
+
+def test_shift_markers():
+    code = f"{marker((2 << 16) | 3)}x;"
+    assert shift_markers(code, 5) == f"{marker((7 << 16) | 3)}x;"
+    assert shift_markers(shift_markers(code, 5), -5) == code
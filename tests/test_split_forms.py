@@ -0,0 +1,58 @@
+import pytest
+
+from src.compiler import SemanticException, compile_source
+
+from conftest import requires_parser
+
+pytestmark = requires_parser
+
+SOURCE = """Number limite = 10
+
+Form cadastro {
+    Field nome String {
+        title = "Nome"
+    }
+}
+
+Form pedido {
+    Field itens Number {
+        onChange {
+            if (itens.value > limite) then {
+                on[itens]display("No máximo " + limite)
+                cancel
+            }
+        }
+    }
+}
+
+cadastro.nome.title = "Nome completo"
+limite = 20
+"""
+
+def test_one_module_per_form():
+    files = compile_source(SOURCE, split_forms=True).files
+    assert {name for name in files if name.endswith(".js")} == {"script.js", "common.js", "form-cadastro.js", "form-pedido.js", "form.js"}
+    assert "lazyForm('cadastro', () => import('./form-cadastro.js'));" in files["script.js"]
+    assert "lazyForm('pedido', () => import('./form-pedido.js'));" in files["script.js"]
+    assert "root.limite = 10;" in files["common.js"]
+    assert "root.limite = 20;" in files["common.js"]
+    assert "export const pedido = new Form('pedido'" in files["form-pedido.js"]
+    assert "root.limite" in files["form-pedido.js"]
+    assert "cadastro" not in files["form-pedido.js"]
+
+def test_root_statement_using_a_form_goes_to_its_module():
+    files = compile_source(SOURCE, split_forms=True).files
+    assert "cadastro" not in files["common.js"]
+    module = files["form-cadastro.js"]
+    assert module.index("export const cadastro = new Form(") < module.index('cadastro.nome.title.set("Nome completo");')
+
+@pytest.mark.parametrize("statement, error", [
+    ("String titulo = cadastro.nome.title", "Root variable 'titulo' cannot read form 'cadastro'"),
+    ("pedido.itens.title = cadastro.nome.title", "Statement uses forms 'cadastro', 'pedido'"),
+])
+def test_rejects_root_statements_spanning_modules(statement, error):
+    with pytest.raises(SemanticException) as exception:
+        compile_source(SOURCE + statement + "\n", split_forms=True)
+    assert len(exception.value.diagnostics) == 1
+    assert error in exception.value.diagnostics[0]
+    compile_source(SOURCE + statement + "\n") # sem --split-forms continua válido